@@ -0,0 +1,149 @@
+"""[Module to serve a synthetic cluster over a fake Kubernetes API]"""
+import collections
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# /api/v1[/namespaces/<ns>]/<kind>[/<name>[/<sub>]] and the same for /apis/<group>/v1
+API_PATH = re.compile(
+    r"^/(?:api/v1|apis/[^/]+/v1)(?:/namespaces/(?P<namespace>[^/]+))?"
+    r"/(?P<kind>[a-z]+)(?:/(?P<name>[^/]+))?(?:/(?P<sub>status|log))?$"
+)
+
+
+class FakeApiServer:
+    """
+    Serve list, read and log calls of a synthetic cluster with injectable latency
+    """
+
+    def __init__(self, resources=None, latency=0.0, port=0):
+        self.latency = latency
+        self.calls = collections.Counter()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+        self.load(resources or {})
+
+    def load(self, resources):
+        """[Index the API objects to serve]
+
+        Args:
+            resources ([dict]): [API objects by kind]
+        """
+        self.by_kind, self.by_namespace, self.by_name = {}, {}, {}
+        for kind, items in resources.items():
+            self.by_kind[kind] = items
+            for item in items:
+                namespace = item["metadata"].get("namespace")
+                self.by_namespace.setdefault((kind, namespace), []).append(item)
+                self.by_name[(kind, namespace, item["metadata"]["name"])] = item
+
+    @property
+    def host(self):
+        """[Host and port of the server]"""
+        return "127.0.0.1:%s" % self.httpd.server_address[1]
+
+    @property
+    def url(self):
+        """[Base url of the server]"""
+        return "http://" + self.host
+
+    @property
+    def call_count(self):
+        """[Number of API requests served, ingress probes excluded]"""
+        with self.lock:
+            return sum(
+                count for call, count in self.calls.items() if call != "probe"
+            )
+
+    def reset_calls(self):
+        """[Forget counted requests]"""
+        with self.lock:
+            self.calls.clear()
+
+    def start(self):
+        """[Serve requests in a background thread]
+
+        Returns:
+            [FakeApiServer]: [Started server]
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """[Stop serving requests]"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def respond(self, path, query):
+        """[Build the response of a GET request]
+
+        Args:
+            path ([str]): [Request path]
+            query ([dict]): [Parsed query string]
+
+        Returns:
+            [tuple]: [Status code, content type and body]
+        """
+        match = API_PATH.match(path)
+        if not match:
+            # anything else is an ingress url being probed
+            return 200, "text/plain", b"ok"
+        namespace, kind, name, sub = match.group("namespace", "kind", "name", "sub")
+        if sub == "log":
+            return 200, "text/plain", b"starting\nerror: connection refused\n"
+        if name:
+            item = self.by_name.get((kind, namespace, name))
+            if item is None:
+                body = {"kind": "Status", "code": 404, "reason": "NotFound"}
+                return 404, "application/json", json.dumps(body).encode()
+            return 200, "application/json", json.dumps(item).encode()
+        if namespace:
+            items = self.by_namespace.get((kind, namespace), [])
+        else:
+            items = self.by_kind.get(kind, [])
+        meta = {"resourceVersion": "1"}
+        limit = int(query.get("limit", ["0"])[0])
+        if limit:
+            start = int(query.get("continue", ["0"])[0] or 0)
+            if start + limit < len(items):
+                meta["continue"] = str(start + limit)
+            items = items[start : start + limit]
+        body = {"kind": "List", "apiVersion": "v1", "metadata": meta, "items": items}
+        return 200, "application/json", json.dumps(body).encode()
+
+    def handler(self):
+        """[Request handler class bound to this server]"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                match = API_PATH.match(url.path)
+                call = (
+                    " ".join(filter(None, match.group("kind", "sub")))
+                    if match
+                    else "probe"
+                )
+                with server.lock:
+                    server.calls[call] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                code, content_type, body = server.respond(url.path, parse_qs(url.query))
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,202 @@
+"""[Benchmark kube-wrench on synthetic clusters of growing size]
+
+Each scale is served by a fake API server in this process while kube-wrench runs
+in a child process, so the peak RSS reported is the one of kube-wrench alone.
+
+e.g. python3 benchmarks/run_benchmark.py --pods 1000,10000 --latency 0.005
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_api import FakeApiServer  # noqa: E402
+from synthetic_cluster import SyntheticCluster  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KUBECONFIG = """apiVersion: v1
+kind: Config
+clusters:
+- name: bench
+  cluster:
+    server: {url}
+contexts:
+- name: bench
+  context:
+    cluster: bench
+    user: bench
+current-context: bench
+users:
+- name: bench
+  user:
+    token: bench
+"""
+
+
+class Benchmark:
+    """
+    Run kube-wrench on all namespaces of a synthetic cluster and measure the run
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.failures = {
+            "CrashLoopBackOff": args.crashloop,
+            "ImagePullBackOff": args.imagepull,
+            "Pending": args.pending,
+            "OOMKilled": args.oomkilled,
+        }
+
+    def cluster(self, pods, ingress_host):
+        """[Generate the synthetic cluster of a scale]
+
+        Args:
+            pods ([int]): [Pods in the cluster]
+            ingress_host ([str]): [Host of the ingress rules]
+
+        Returns:
+            [dict]: [API objects by kind]
+        """
+        return SyntheticCluster(
+            pods=pods,
+            pods_per_namespace=self.args.pods_per_namespace,
+            services_per_namespace=self.args.services_per_namespace,
+            ingresses_per_namespace=self.args.ingresses_per_namespace,
+            quotas_per_namespace=self.args.quotas_per_namespace,
+            events_per_namespace=self.args.events_per_namespace,
+            failures=self.failures,
+            ingress_host=ingress_host,
+            seed=self.args.seed,
+        ).generate()
+
+    def run(self, pods):
+        """[Serve a synthetic cluster and run kube-wrench against it]
+
+        Args:
+            pods ([int]): [Pods in the cluster]
+
+        Returns:
+            [dict]: [Wall time, API calls and peak RSS of the run]
+        """
+        server = FakeApiServer(latency=self.args.latency)
+        # ingress urls point back to the fake server so probes get a response
+        resources = self.cluster(pods, server.host)
+        server.load(resources)
+        server.start()
+        with tempfile.NamedTemporaryFile("w", suffix=".kubeconfig", delete=False) as cfg:
+            cfg.write(KUBECONFIG.format(url=server.url))
+        command = [sys.executable, os.path.join(REPO_DIR, "kube-wrench.py"), "-n", "all"]
+        command += self.args.wrench_args.split()
+        env = dict(os.environ, KUBECONFIG=cfg.name)
+        try:
+            start_time = time.time()
+            proc = subprocess.Popen(
+                command,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL if not self.args.verbose else None,
+            )
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall_time = time.time() - start_time
+        finally:
+            server.stop()
+            os.unlink(cfg.name)
+        # ru_maxrss is in KiB on linux and in bytes on macOS
+        peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        return {
+            "pods": pods,
+            "namespaces": len(resources["namespaces"]),
+            "wall_time_s": round(wall_time, 2),
+            "api_calls": server.call_count,
+            "probes": server.calls.get("probe", 0),
+            "peak_rss_mb": round(peak_rss, 1),
+            "exit_code": os.waitstatus_to_exitcode(status)
+            if hasattr(os, "waitstatus_to_exitcode")
+            else status >> 8,
+            "calls": dict(server.calls),
+        }
+
+    @staticmethod
+    def report(results):
+        """[Print results of all scales as a table]
+
+        Args:
+            results ([list]): [Results of each scale]
+        """
+        columns = [
+            "pods",
+            "namespaces",
+            "wall_time_s",
+            "api_calls",
+            "probes",
+            "peak_rss_mb",
+            "exit_code",
+        ]
+        print("  ".join("%12s" % column for column in columns))
+        for result in results:
+            print("  ".join("%12s" % result[column] for column in columns))
+
+
+def main():
+    """[Main function]"""
+    p = argparse.ArgumentParser(
+        description="Benchmark kube-wrench on synthetic clusters served by a fake API."
+    )
+    p.add_argument(
+        "--pods",
+        default="1000,10000,100000",
+        help="comma separated pod counts of the clusters. Default is 1000,10000,100000.",
+    )
+    p.add_argument("--pods-per-namespace", type=int, default=100)
+    p.add_argument("--services-per-namespace", type=int, default=5)
+    p.add_argument("--ingresses-per-namespace", type=int, default=2)
+    p.add_argument("--quotas-per-namespace", type=int, default=1)
+    p.add_argument("--events-per-namespace", type=int, default=10)
+    p.add_argument("--crashloop", type=float, default=0.02, help="share of pods.")
+    p.add_argument("--imagepull", type=float, default=0.01, help="share of pods.")
+    p.add_argument("--pending", type=float, default=0.01, help="share of pods.")
+    p.add_argument("--oomkilled", type=float, default=0.01, help="share of pods.")
+    p.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="seconds added to every API response. Default is 0.",
+    )
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument(
+        "--wrench-args",
+        default="",
+        help='extra kube-wrench arguments, e.g. "--workers 8".',
+    )
+    p.add_argument("--json", action="store_true", help="print results as JSON.")
+    p.add_argument("--verbose", action="store_true", help="show kube-wrench logs.")
+    args = p.parse_args()
+
+    benchmark = Benchmark(args)
+    results = []
+    for pods in [int(count) for count in args.pods.split(",")]:
+        results.append(benchmark.run(pods))
+        if not args.json:
+            print(
+                "%s pods: %ss, %s api calls, %s MB peak RSS."
+                % (
+                    pods,
+                    results[-1]["wall_time_s"],
+                    results[-1]["api_calls"],
+                    results[-1]["peak_rss_mb"],
+                ),
+                file=sys.stderr,
+            )
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        Benchmark.report(results)
+
+
+if __name__ == "__main__":
+    main()
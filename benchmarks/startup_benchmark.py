@@ -0,0 +1,168 @@
+"""[Benchmark kube-wrench cold start with an -X importtime breakdown]
+
+Each scenario starts kube-wrench in a fresh interpreter several times. The
+median wall time is reported with the import time of each top level package,
+so a release that pulls a heavy import back into the entry path shows up.
+Results saved with --json can be passed as --baseline to a later run.
+
+e.g. python3 benchmarks/startup_benchmark.py --runs 10 --json > startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# scenario name to kube-wrench arguments and extra environment
+SCENARIOS = {
+    "help": (["--help"], {}),
+    "bad-args": (["--no-such-flag"], {}),
+    # no kubeconfig and no in-cluster config, fails once kubernetes is loaded
+    "kubeconfig-fallback": (
+        ["-n", "default"],
+        {"KUBECONFIG": os.devnull, "KUBERNETES_SERVICE_HOST": ""},
+    ),
+}
+
+
+class StartupBenchmark:
+    """
+    Run kube-wrench scenarios in fresh interpreters and break down their imports
+    """
+
+    def __init__(self, runs=5, top=10):
+        self.runs = runs
+        self.top = top
+
+    @staticmethod
+    def parse_importtime(stderr):
+        """[Self import time of each top level package]
+
+        Args:
+            stderr ([str]): [Stderr of a run with -X importtime]
+
+        Returns:
+            [dict]: [Package to self import time in microseconds]
+        """
+        packages = {}
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "imported package" in line:
+                continue
+            self_us, _, module = line[len("import time:") :].split("|")
+            package = module.strip().split(".")[0]
+            packages[package] = packages.get(package, 0) + int(self_us)
+        return packages
+
+    def run_once(self, argv, env):
+        """[Start kube-wrench once]
+
+        Args:
+            argv ([list]): [kube-wrench arguments]
+            env ([dict]): [Extra environment]
+
+        Returns:
+            [tuple]: [Wall time in seconds and import time by package]
+        """
+        command = [sys.executable, "-X", "importtime"]
+        command += [os.path.join(REPO_DIR, "kube-wrench.py")] + argv
+        start_time = time.perf_counter()
+        proc = subprocess.run(
+            command,
+            env=dict(os.environ, **env),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        return time.perf_counter() - start_time, self.parse_importtime(proc.stderr)
+
+    def run(self, name, argv, env):
+        """[Start kube-wrench for a scenario several times]
+
+        Args:
+            name ([str]): [Scenario name]
+            argv ([list]): [kube-wrench arguments]
+            env ([dict]): [Extra environment]
+
+        Returns:
+            [dict]: [Median wall time, import time and slowest packages]
+        """
+        wall_times, imports = [], []
+        for _ in range(self.runs):
+            wall_time, packages = self.run_once(argv, env)
+            wall_times.append(wall_time)
+            imports.append(packages)
+        packages = {
+            package: statistics.median(run.get(package, 0) for run in imports)
+            for package in set().union(*imports)
+        }
+        slowest = sorted(packages.items(), key=lambda item: -item[1])[: self.top]
+        return {
+            "scenario": name,
+            "wall_time_ms": round(statistics.median(wall_times) * 1000, 1),
+            "min_wall_time_ms": round(min(wall_times) * 1000, 1),
+            "import_time_ms": round(sum(packages.values()) / 1000, 1),
+            "modules_imported": round(statistics.median(len(run) for run in imports)),
+            "packages_ms": {package: round(us / 1000, 1) for package, us in slowest},
+        }
+
+    @staticmethod
+    def report(results, baseline=None):
+        """[Print results of all scenarios]
+
+        Args:
+            results ([list]): [Results of each scenario]
+            baseline ([dict]): [Scenario to result of an earlier run]
+        """
+        for result in results:
+            line = "%-20s %8sms wall, %8sms imports" % (
+                result["scenario"],
+                result["wall_time_ms"],
+                result["import_time_ms"],
+            )
+            previous = (baseline or {}).get(result["scenario"])
+            if previous:
+                line += " (%+.1fms wall vs baseline)" % (
+                    result["wall_time_ms"] - previous["wall_time_ms"]
+                )
+            print(line)
+            for package, import_ms in result["packages_ms"].items():
+                print("    %-30s %8sms" % (package, import_ms))
+
+
+def main():
+    """[Main function]"""
+    p = argparse.ArgumentParser(
+        description="Benchmark kube-wrench cold start with an -X importtime breakdown."
+    )
+    p.add_argument("--runs", type=int, default=5, help="starts per scenario.")
+    p.add_argument("--top", type=int, default=10, help="slowest packages shown.")
+    p.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help="comma separated scenarios. Default is %s." % ",".join(SCENARIOS),
+    )
+    p.add_argument("--baseline", help="JSON results of an earlier run to compare.")
+    p.add_argument("--json", action="store_true", help="print results as JSON.")
+    args = p.parse_args()
+
+    benchmark = StartupBenchmark(args.runs, args.top)
+    results = []
+    for name in args.scenarios.split(","):
+        argv, env = SCENARIOS[name]
+        results.append(benchmark.run(name, argv, env))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = {result["scenario"]: result for result in json.load(baseline_file)}
+    StartupBenchmark.report(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""[Module to generate synthetic clusters for benchmarks]"""
+import random
+
+
+class SyntheticCluster:
+    """
+    Build API objects of a fake cluster with a configurable mix of failure states
+    """
+
+    KINDS = [
+        "namespaces",
+        "pods",
+        "services",
+        "ingresses",
+        "resourcequotas",
+        "events",
+        "persistentvolumeclaims",
+        "secrets",
+        "configmaps",
+    ]
+
+    def __init__(
+        self,
+        pods=1000,
+        pods_per_namespace=100,
+        services_per_namespace=5,
+        ingresses_per_namespace=2,
+        quotas_per_namespace=1,
+        events_per_namespace=10,
+        failures=None,
+        ingress_host="127.0.0.1",
+        seed=0,
+    ):
+        self.pods = pods
+        self.pods_per_namespace = pods_per_namespace
+        self.services_per_namespace = services_per_namespace
+        self.ingresses_per_namespace = ingresses_per_namespace
+        self.quotas_per_namespace = quotas_per_namespace
+        self.events_per_namespace = events_per_namespace
+        # share of pods in each failure state, the rest are running
+        self.failures = failures or {
+            "CrashLoopBackOff": 0.02,
+            "ImagePullBackOff": 0.01,
+            "Pending": 0.01,
+            "OOMKilled": 0.01,
+        }
+        self.ingress_host = ingress_host
+        self.random = random.Random(seed)
+        self.resources = {kind: [] for kind in self.KINDS}
+
+    @staticmethod
+    def metadata(name, namespace=None, labels=None):
+        """[Object metadata]"""
+        meta = {"name": name, "uid": "%s-%s" % (namespace, name), "resourceVersion": "1"}
+        if namespace:
+            meta["namespace"] = namespace
+        if labels:
+            meta["labels"] = labels
+        return meta
+
+    def failure_state(self):
+        """[Pick a failure state for a pod, None for a healthy pod]
+
+        Returns:
+            [str]: [Failure state]
+        """
+        pick = self.random.random()
+        for state, share in self.failures.items():
+            if pick < share:
+                return state
+            pick -= share
+        return None
+
+    def pod(self, namespace, name, app, state):
+        """[Pod object in a failure state]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            name ([str]): [Pod name]
+            app ([str]): [App label, matched by a service]
+            state ([str]): [Failure state, None for a running pod]
+
+        Returns:
+            [dict]: [Pod object]
+        """
+        container_status = {
+            "name": "app",
+            "image": "registry.local/%s:1.0" % app,
+            "imageID": "",
+            "ready": state is None,
+            "restartCount": 0,
+            "state": {"running": {"startedAt": "2024-01-01T00:00:00Z"}},
+        }
+        phase, node = "Running", "node-%s" % self.random.randint(0, 99)
+        if state in ["CrashLoopBackOff", "ImagePullBackOff"]:
+            container_status["restartCount"] = 5 if state == "CrashLoopBackOff" else 0
+            container_status["state"] = {
+                "waiting": {"reason": state, "message": "back-off restarting"}
+            }
+        elif state == "OOMKilled":
+            container_status["restartCount"] = 1
+            container_status["state"] = {
+                "terminated": {
+                    "reason": "OOMKilled",
+                    "exitCode": 137,
+                    "finishedAt": "2024-01-01T00:00:00Z",
+                }
+            }
+        elif state == "Pending":
+            phase, node = "Pending", None
+            container_status["state"] = {"waiting": {"reason": "ContainerCreating"}}
+        volumes = [
+            {"name": "config", "configMap": {"name": "%s-config" % app}},
+            {"name": "creds", "secret": {"secretName": "%s-creds" % app}},
+        ]
+        if state == "Pending":
+            volumes.append(
+                {"name": "data", "persistentVolumeClaim": {"claimName": name + "-data"}}
+            )
+        return {
+            "metadata": self.metadata(name, namespace, {"app": app}),
+            "spec": {
+                "nodeName": node,
+                "containers": [
+                    {
+                        "name": "app",
+                        "image": container_status["image"],
+                        "imagePullPolicy": "IfNotPresent",
+                        "ports": [{"containerPort": 8080}],
+                    }
+                ],
+                "volumes": volumes,
+            },
+            "status": {
+                "phase": phase,
+                "podIP": None if node is None else "10.0.0.1",
+                "containerStatuses": [container_status],
+                "conditions": []
+                if node
+                else [
+                    {
+                        "type": "PodScheduled",
+                        "status": "False",
+                        "reason": "Unschedulable",
+                        "message": "0/100 nodes are available",
+                    }
+                ],
+            },
+        }
+
+    def event(self, namespace, index, pod_name, reason):
+        """[Warning event of a pod]"""
+        return {
+            "metadata": self.metadata("%s.%s" % (pod_name, index), namespace),
+            "type": "Warning",
+            "reason": reason,
+            "message": "%s for pod %s" % (reason, pod_name),
+            "involvedObject": {
+                "kind": "Pod",
+                "namespace": namespace,
+                "name": pod_name,
+                "uid": "%s-%s" % (namespace, pod_name),
+            },
+            "lastTimestamp": "2024-01-01T00:%02d:00Z" % (index % 60),
+        }
+
+    def add_namespace(self, namespace, pod_count):
+        """[Add a namespace with its pods, services, ingresses, quotas and events]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            pod_count ([int]): [Pods in the namespace]
+        """
+        res = self.resources
+        res["namespaces"].append(
+            {"metadata": self.metadata(namespace), "status": {"phase": "Active"}}
+        )
+        apps = ["app-%s" % i for i in range(max(self.services_per_namespace, 1))]
+        for app in apps[: self.services_per_namespace]:
+            res["services"].append(
+                {
+                    "metadata": self.metadata(app, namespace),
+                    "spec": {
+                        "selector": {"app": app},
+                        "type": "ClusterIP",
+                        "clusterIP": "10.96.0.1",
+                        "ports": [{"port": 80, "targetPort": 8080}],
+                    },
+                }
+            )
+            res["configmaps"].append({"metadata": self.metadata(app + "-config", namespace)})
+            res["secrets"].append({"metadata": self.metadata(app + "-creds", namespace)})
+        for app in apps[: self.ingresses_per_namespace]:
+            res["ingresses"].append(
+                {
+                    "metadata": self.metadata(app, namespace),
+                    "spec": {
+                        "rules": [
+                            {
+                                "host": self.ingress_host,
+                                "http": {
+                                    "paths": [
+                                        {
+                                            "path": "/%s/%s" % (namespace, app),
+                                            "pathType": "Prefix",
+                                            "backend": {
+                                                "service": {
+                                                    "name": app,
+                                                    "port": {"number": 80},
+                                                }
+                                            },
+                                        }
+                                    ]
+                                },
+                            }
+                        ]
+                    },
+                }
+            )
+        for index in range(self.quotas_per_namespace):
+            res["resourcequotas"].append(
+                {
+                    "metadata": self.metadata("quota-%s" % index, namespace),
+                    "spec": {},
+                    "status": {
+                        "hard": {"cpu": "100", "memory": "200Gi", "pods": "500"},
+                        "used": {
+                            "cpu": "%sm" % self.random.randint(1000, 99000),
+                            "memory": "%sMi" % self.random.randint(1024, 204000),
+                            "pods": str(pod_count),
+                        },
+                    },
+                }
+            )
+        failing = []
+        for index in range(pod_count):
+            name = "pod-%s" % index
+            state = self.failure_state()
+            res["pods"].append(self.pod(namespace, name, self.random.choice(apps), state))
+            if state:
+                failing.append((name, state))
+            if state == "Pending":
+                res["persistentvolumeclaims"].append(
+                    {
+                        "metadata": self.metadata(name + "-data", namespace),
+                        "spec": {"storageClassName": "standard"},
+                        "status": {"phase": "Pending"},
+                    }
+                )
+        for index in range(self.events_per_namespace):
+            if failing:
+                pod_name, reason = failing[index % len(failing)]
+            else:
+                pod_name, reason = "pod-%s" % (index % max(pod_count, 1)), "BackOff"
+            res["events"].append(self.event(namespace, index, pod_name, reason))
+
+    def generate(self):
+        """[Generate all namespaces of the cluster]
+
+        Returns:
+            [dict]: [API objects by kind]
+        """
+        namespace_index, remaining = 0, self.pods
+        while remaining > 0:
+            pod_count = min(self.pods_per_namespace, remaining)
+            self.add_namespace("bench-%s" % namespace_index, pod_count)
+            namespace_index += 1
+            remaining -= pod_count
+        return self.resources
@@ -3,31 +3,140 @@
 import os
 import sys
 import time
-import urllib3
+from concurrent.futures import ThreadPoolExecutor
 from modules.logging import Logger
 from modules.argparse import ArgParse
-from modules.kube_config import KubeConfig
-from modules.resource_quota import ResourceQuotaWrench
-from modules.pods import PodWrench
-from modules.namespace import NameSpaceWrench
+from modules.findings import FindingSink
+from modules.profiler import Profiler
 from modules.output import Output
 
+# wrench, client and prober modules import kubernetes.client or requests, which
+# take hundreds of milliseconds to load. They are imported in the functions that
+# first need them so --help and argument errors return without that cost.
+
 
 class KubeWrench:
     """[Kube-wrench main class]"""
 
-    def __init__(self, logger, k8s_config, namespace):
+    def __init__(
+        self,
+        logger,
+        kube_client,
+        namespace,
+        workers=1,
+        prober=None,
+        sink=None,
+        snapshot=None,
+        save_snapshot=None,
+        quota_threshold=90,
+        collector=None,
+        cluster=None,
+    ):
+        from modules.snapshot import ClusterSnapshot
+        from modules.prober import IngressProber
+        from modules.log_collector import LogCollector
+
         self.logger = logger
-        self.k8s_config = k8s_config
+        self.kube_client = kube_client
         self.namespace = namespace
+        self.workers = workers
+        self.prober = prober or IngressProber(logger)
+        self.sink = sink or FindingSink()
+        # stdout is kept for findings when they are streamed
+        self.out = sys.stderr if self.sink.stream else sys.stdout
+        self.snapshot = snapshot or ClusterSnapshot(kube_client, logger)
+        self.save_snapshot = save_snapshot
+        self.quota_threshold = quota_threshold
+        self.collector = collector or LogCollector(kube_client)
+        # set when several clusters are diagnosed at once
+        self.cluster = cluster
 
-    def kube_wrench_process(self):
+    def kube_wrench_process(self, namespace, logger):
         """[Collection of kube-wrench processing functions]"""
-        PodWrench(self.k8s_config, self.namespace, self.logger).pod_wrench()
+        from modules.pods import PodWrench
+        from modules.resource_quota import ResourceQuotaWrench
+
+        PodWrench(
+            self.kube_client,
+            namespace,
+            logger,
+            self.snapshot,
+            self.prober,
+            self.sink,
+            self.collector,
+        ).pod_wrench()
         ResourceQuotaWrench(
-            self.k8s_config, self.namespace, self.logger
+            self.kube_client,
+            namespace,
+            logger,
+            self.snapshot,
+            self.sink,
+            self.quota_threshold,
         ).resource_quota_wrench()
 
+    def kube_wrench_namespace(self, namespace):
+        """[Process a namespace with its logs buffered]
+
+        Args:
+            namespace ([str]): [Namespace name]
+
+        Returns:
+            [tuple]: [Buffered logger and time taken in seconds]
+        """
+        logger = Logger.buffered_logger(
+            "%s.%s" % (self.cluster, namespace) if self.cluster else namespace
+        )
+        start_time = time.time()
+        try:
+            self.kube_wrench_process(namespace, logger)
+        except Exception:
+            logger.exception("Processing of namespace %s failed.", namespace)
+        return logger, time.time() - start_time
+
+    def kube_wrench_all(self, ns_names):
+        """[Process all namespaces, in parallel if more than one worker is set]
+
+        Args:
+            ns_names ([list]): [Namespace names]
+        """
+        ns_time_taken = {}
+        if self.workers > 1:
+            self.logger.info("Processing namespaces with %s workers.", self.workers)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(self.kube_wrench_namespace, ns_name)
+                    for ns_name in ns_names
+                ]
+                # output is written in namespace order as soon as it is complete
+                for ns_name, future in zip(ns_names, futures):
+                    logger, ns_time_taken[ns_name] = future.result()
+                    Logger.flush_buffered(logger, self.logger)
+                    self.logger.info(
+                        "Namespace %s processed in %ss.",
+                        ns_name,
+                        round(ns_time_taken[ns_name], 2),
+                    )
+                    if not self.cluster:
+                        print("\n\n", file=self.out)
+        else:
+            for ns_name in ns_names:
+                start_time = time.time()
+                self.kube_wrench_process(ns_name, self.logger)
+                ns_time_taken[ns_name] = time.time() - start_time
+                self.logger.info(
+                    "Namespace %s processed in %ss.",
+                    ns_name,
+                    round(ns_time_taken[ns_name], 2),
+                )
+                if not self.cluster:
+                    print("\n\n", file=self.out)
+        for ns_name in sorted(ns_time_taken, key=ns_time_taken.get, reverse=True)[:10]:
+            self.logger.info(
+                "Slowest namespaces: %s took %ss.",
+                ns_name,
+                round(ns_time_taken[ns_name], 2),
+            )
+
     def kube_wrench_main(self):
         """[Kube-wrench main function]"""
         self.logger.info("Starting kube-wrench.")
@@ -36,30 +145,273 @@ class KubeWrench:
                 "No namespace specified. Kube-wrench will run on default namespace."
             )
             self.namespace = "default"
-            self.kube_wrench_process()
-        elif self.namespace in ["all", "ALL", "All"]:
+        if self.namespace in ["all", "ALL", "All"]:
             self.logger.info("Running on all namespaces.")
-            ns_list = NameSpaceWrench(self.k8s_config, self.logger).namespace_wrench()
-            if ns_list:
-                for _ns in ns_list.items:
-                    self.namespace = _ns.metadata.name
-                    self.kube_wrench_process()
-                    print("\n\n")
+            if self.snapshot.offline:
+                self.kube_wrench_all(self.snapshot.namespace_names())
+            else:
+                from modules.namespace import NameSpaceWrench
+
+                ns_list = NameSpaceWrench(
+                    self.kube_client, self.logger
+                ).namespace_wrench()
+                if ns_list:
+                    self.snapshot.load()
+                    self.kube_wrench_all([_ns.metadata.name for _ns in ns_list.items])
         else:
             self.logger.info("Running on namespace: %s", self.namespace)
-            self.kube_wrench_process()
+            if self.save_snapshot and not self.snapshot.offline:
+                # namespace resources are listed up front so they can be saved
+                self.snapshot.load(self.namespace)
+            self.kube_wrench_process(self.namespace, self.logger)
+        if self.save_snapshot:
+            self.snapshot.save(self.save_snapshot)
+
+
+class FleetWrench:
+    """[Diagnose several clusters concurrently, each with its own api client]"""
+
+    def __init__(self, logger, clusters, namespace, args, prober, sink, profiler=None):
+        self.logger = logger
+        self.clusters = clusters
+        self.namespace = namespace
+        self.args = args
+        self.prober = prober
+        self.sink = sink
+        self.profiler = profiler
+
+    def cluster_wrench(self, cluster):
+        """[Diagnose one cluster with its logs buffered]
+
+        Args:
+            cluster ([tuple]): [Cluster name, kubeconfig file and context name]
+
+        Returns:
+            [tuple]: [Buffered logger, findings sink and time taken in seconds]
+        """
+        from modules.kube_config import KubeConfig
+        from modules.kube_client import KubeClient
+        from modules.log_collector import LogCollector
+
+        name, config_file, context = cluster
+        logger = Logger.buffered_logger("cluster." + name)
+        sink = self.sink.labelled(cluster=name)
+        start_time = time.time()
+        try:
+            k8s_config = KubeConfig.load_kube_config(
+                self.args.output, logger, config_file, context
+            )
+            # clusters do not share connections, a slow one can not hold up others
+            with KubeClient(
+                k8s_config,
+                logger,
+                max(self.args.pool_size, self.args.workers),
+                self.args.keepalive,
+                self.args.page_size,
+            ) as kube_client:
+                if self.profiler:
+                    self.profiler.instrument_client(kube_client)
+                collector = LogCollector(
+                    kube_client,
+                    self.args.log_workers,
+                    self.args.log_limit_bytes,
+                    self.args.log_tail_lines,
+                )
+                try:
+                    KubeWrench(
+                        logger,
+                        kube_client,
+                        self.namespace,
+                        self.args.workers,
+                        self.prober,
+                        sink,
+                        quota_threshold=self.args.quota_threshold,
+                        collector=collector,
+                        cluster=name,
+                    ).kube_wrench_main()
+                finally:
+                    collector.close()
+        except Exception as exp:
+            logger.error("Diagnosis of cluster %s failed: %s", name, exp)
+            logger.debug("Diagnosis of cluster %s failed.", name, exc_info=True)
+            sink.report(
+                None,
+                "Cluster",
+                name,
+                "cluster_wrench",
+                "CLUSTER_FAILED",
+                "error",
+                "Diagnosis of cluster failed: %s" % exp,
+            )
+        return logger, sink, time.time() - start_time
+
+    def fleet_wrench(self):
+        """[Diagnose all clusters and write their output in the order given]"""
+        workers = min(self.args.cluster_workers, len(self.clusters))
+        self.logger.info(
+            "Diagnosing %s clusters with %s workers.", len(self.clusters), workers
+        )
+        cluster_time_taken = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.cluster_wrench, cluster)
+                for cluster in self.clusters
+            ]
+            for (name, _, _), future in zip(self.clusters, futures):
+                logger, sink, cluster_time_taken[name] = future.result()
+                self.logger.info("Cluster %s:", name)
+                Logger.flush_buffered(logger)
+                severities = {}
+                for (_, severity), count in sink.counts.items():
+                    severities[severity] = severities.get(severity, 0) + count
+                self.logger.info(
+                    "Cluster %s processed in %ss with %s errors and %s warnings.",
+                    name,
+                    round(cluster_time_taken[name], 2),
+                    severities.get("error", 0),
+                    severities.get("warning", 0),
+                )
+                print("\n\n", file=sys.stderr if self.sink.stream else sys.stdout)
+        for name in sorted(
+            cluster_time_taken, key=cluster_time_taken.get, reverse=True
+        )[:10]:
+            self.logger.info(
+                "Slowest clusters: %s took %ss.", name, round(cluster_time_taken[name], 2)
+            )
 
 
 def main():
     """[Main function]"""
     start_time = time.time()
-    urllib3.disable_warnings()
     args = ArgParse.arg_parse()
     logger = Logger.get_logger(args.output, args.silent, args.loglevel)
-    k8s_config = KubeConfig.load_kube_config(args.output, logger)
+    import urllib3
+    from modules.kube_config import KubeConfig
+    from modules.kube_client import KubeClient
+    from modules.snapshot import ClusterSnapshot
+    from modules.prober import IngressProber
+    from modules.log_collector import LogCollector
+
+    urllib3.disable_warnings()
+    # no cluster is needed when checks run on a saved snapshot
+    clusters = (
+        [("snapshot", None, None)]
+        if args.from_snapshot
+        else KubeConfig.clusters(args.kubeconfig, args.context)
+    )
     namespace = args.namespace
-    KubeWrench(logger, k8s_config, namespace).kube_wrench_main()
-    Output.time_taken(start_time)
+    # each worker needs its own connection to not wait on the pool
+    pool_size = max(args.pool_size, args.workers)
+    sink = FindingSink(sys.stdout if args.output == "ndjson" else None)
+    prober = IngressProber(
+        logger,
+        args.probe_workers,
+        args.probe_per_host,
+        args.probe_timeout,
+        args.probe_deadline,
+        args.probe_cache_ttl,
+    )
+    profiler = Profiler() if args.profile else None
+    if len(clusters) > 1:
+        if profiler:
+            profiler.instrument_prober(prober)
+        try:
+            FleetWrench(
+                logger, clusters, namespace, args, prober, sink, profiler
+            ).fleet_wrench()
+        finally:
+            prober.close()
+        Output.time_taken(start_time, sys.stderr if sink.stream else sys.stdout)
+        if profiler:
+            profiler.report(args.profile, sys.stderr if sink.stream else sys.stdout)
+        return
+    _, config_file, context = clusters[0]
+    k8s_config = (
+        None
+        if args.from_snapshot
+        else KubeConfig.load_kube_config(args.output, logger, config_file, context)
+    )
+    with KubeClient(
+        k8s_config,
+        logger,
+        pool_size,
+        args.keepalive,
+        args.page_size,
+        bool(args.from_snapshot),
+    ) as kube_client:
+        if profiler:
+            profiler.instrument_client(kube_client)
+            profiler.instrument_prober(prober)
+        collector = LogCollector(
+            kube_client, args.log_workers, args.log_limit_bytes, args.log_tail_lines
+        )
+        snapshot = ClusterSnapshot(kube_client, logger)
+        if args.from_snapshot:
+            snapshot.restore(args.from_snapshot)
+        if args.watch or args.serve:
+            # kinds which are not watched are listed again after cache_ttl
+            snapshot.cache_ttl = args.cache_ttl
+        try:
+            if args.serve:
+                from modules.server import ServeWrench
+
+                ServeWrench(
+                    kube_client,
+                    None if namespace in ["all", "ALL", "All"] else namespace or "default",
+                    logger,
+                    snapshot,
+                    prober,
+                    sink,
+                    args.quota_threshold,
+                    collector,
+                    address=args.serve,
+                ).serve_wrench()
+            elif args.state_file:
+                from modules.incremental import IncrementalWrench
+
+                IncrementalWrench(
+                    kube_client,
+                    None if namespace in ["all", "ALL", "All"] else namespace or "default",
+                    logger,
+                    snapshot,
+                    prober,
+                    sink,
+                    args.quota_threshold,
+                    collector,
+                    state_file=args.state_file,
+                ).incremental_wrench()
+            elif args.watch:
+                from modules.watch import WatchWrench
+
+                WatchWrench(
+                    kube_client,
+                    None if namespace in ["all", "ALL", "All"] else namespace or "default",
+                    logger,
+                    snapshot,
+                    prober,
+                    sink,
+                    args.quota_threshold,
+                    collector,
+                ).watch_wrench()
+            else:
+                KubeWrench(
+                    logger,
+                    kube_client,
+                    namespace,
+                    args.workers,
+                    prober,
+                    sink,
+                    snapshot,
+                    args.save_snapshot,
+                    args.quota_threshold,
+                    collector,
+                ).kube_wrench_main()
+        finally:
+            prober.close()
+            collector.close()
+    Output.time_taken(start_time, sys.stderr if sink.stream else sys.stdout)
+    if profiler:
+        profiler.report(args.profile, sys.stderr if sink.stream else sys.stdout)
 
 
 if __name__ == "__main__":
@@ -15,7 +15,21 @@ class ArgParse:
         p.add_argument(
             "-k",
             "--kubeconfig",
-            help="pass kubeconfig of the cluster. If not passed, picks KUBECONFIG from env",
+            action="append",
+            help="pass kubeconfig of the cluster. If not passed, picks KUBECONFIG from env.\n"
+            "Can be repeated to diagnose several clusters at once.",
+        )
+        p.add_argument(
+            "--context",
+            action="append",
+            help="kubeconfig context to use instead of the current one. Can be repeated,\n"
+            "each context of each kubeconfig is diagnosed as a cluster.",
+        )
+        p.add_argument(
+            "--cluster-workers",
+            type=int,
+            default=20,
+            help="clusters diagnosed concurrently. Default is 20.",
         )
         p.add_argument(
             "-n", "--namespace", help="check resources in specific namespace."
@@ -24,12 +38,157 @@ class ArgParse:
             "-o",
             "--output",
             default="stdout",
-            help="output formats json|text. Default is text on stdout.",
+            help="output formats json|ndjson|text. Default is text on stdout.\n"
+            "ndjson writes findings to stdout as JSON lines and logs to stderr.",
         )
         p.add_argument(
             "--loglevel", default="INFO", help="sets logging level WARNING|DEBUG. default is INFO."
         )
         p.add_argument("--silent", action="store_true", help="silence the logging.")
+        p.add_argument(
+            "--pool-size",
+            type=int,
+            default=10,
+            help="connections kept in the api client pool. Default is 10.",
+        )
+        p.add_argument(
+            "--keepalive",
+            type=int,
+            default=60,
+            help="TCP keepalive idle seconds for pooled connections, 0 disables. Default is 60.",
+        )
+
+        p.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="namespaces diagnosed in parallel with -n all. Default is 1.",
+        )
+        p.add_argument(
+            "--probe-workers",
+            type=int,
+            default=10,
+            help="ingress urls probed concurrently. Default is 10.",
+        )
+        p.add_argument(
+            "--probe-per-host",
+            type=int,
+            default=2,
+            help="connections opened to one ingress host at a time. Default is 2.",
+        )
+        p.add_argument(
+            "--probe-timeout",
+            type=int,
+            default=5,
+            help="timeout in seconds of one ingress url request. Default is 5.",
+        )
+        p.add_argument(
+            "--probe-deadline",
+            type=int,
+            default=60,
+            help="seconds to finish probing ingress urls of a namespace. Default is 60.",
+        )
+        p.add_argument(
+            "--probe-cache-ttl",
+            type=int,
+            default=300,
+            help="seconds an ingress url probe result is reused. Default is 300.",
+        )
+        p.add_argument(
+            "--log-workers",
+            type=int,
+            default=10,
+            help="container logs fetched concurrently. Default is 10.",
+        )
+        p.add_argument(
+            "--log-limit-bytes",
+            type=int,
+            default=262144,
+            help="maximum bytes of logs fetched per container. Default is 262144.",
+        )
+        p.add_argument(
+            "--log-tail-lines",
+            type=int,
+            default=1000,
+            help="last log lines of a container scanned for failure signatures. "
+            "Default is 1000.",
+        )
+        p.add_argument(
+            "--page-size",
+            type=int,
+            default=500,
+            help="items fetched per page of list calls. Default is 500.",
+        )
+        p.add_argument(
+            "--watch",
+            action="store_true",
+            help="keep running and report findings as they appear or clear.",
+        )
+        p.add_argument(
+            "--serve",
+            metavar="[HOST:]PORT",
+            help="keep caches current with watches and serve GET /diagnose?namespace=X,\n"
+            "/metrics in Prometheus format and /healthz on this address.",
+        )
+        p.add_argument(
+            "--cache-ttl",
+            type=int,
+            default=60,
+            help="seconds secret and configmap names, PersistentVolumes and\n"
+            "StorageClasses are reused by --watch and --serve. Default is 60.",
+        )
+        p.add_argument(
+            "--state-file",
+            metavar="FILE",
+            help="keep resources, resource versions and findings of the run in FILE.\n"
+            "Next runs resume watches from it, check only what changed and carry\n"
+            "over findings of unchanged objects.",
+        )
+        p.add_argument(
+            "--save-snapshot",
+            metavar="FILE",
+            help="save the resources fetched in this run to a snapshot file.",
+        )
+        p.add_argument(
+            "--from-snapshot",
+            metavar="FILE",
+            help="run checks on a saved snapshot file instead of the cluster.\n"
+            "Ingress urls are not probed in this mode.",
+        )
+        p.add_argument(
+            "--quota-threshold",
+            type=float,
+            default=90,
+            help="quota usage percentage above which a quota is reported. Default is 90.",
+        )
+        p.add_argument(
+            "--profile",
+            nargs="?",
+            const="table",
+            choices=["table", "json"],
+            help="print count, latency, bytes and errors of api calls and\n"
+            "ingress probes at the end of the run as table|json. Default is table.",
+        )
 
         args = p.parse_args()
+        if args.watch and args.from_snapshot:
+            p.error("--watch can not be used with --from-snapshot.")
+        if args.serve and args.from_snapshot:
+            p.error("--serve can not be used with --from-snapshot.")
+        clusters = len(args.kubeconfig or [None]) * len(args.context or [None])
+        if clusters > 1 and (
+            args.watch
+            or args.serve
+            or args.state_file
+            or args.save_snapshot
+            or args.from_snapshot
+        ):
+            p.error(
+                "--watch, --serve, --state-file, --save-snapshot and --from-snapshot "
+                "can only be used with one cluster."
+            )
+        if args.state_file and (args.watch or args.serve or args.from_snapshot):
+            p.error(
+                "--state-file can not be used with --watch, --serve or --from-snapshot."
+            )
         return args
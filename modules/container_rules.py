@@ -0,0 +1,218 @@
+"""[Module with diagnosis rules of container states]"""
+
+
+class ContainerRules:
+    """
+    Registry of container state reasons to their severity, hint and follow-up checks
+    """
+
+    SEVERITIES = ("info", "warning", "error")
+
+    # follow-up checks a rule can ask for, run by ContainerWrench
+    ACTIONS = ("image_pull", "references", "logs")
+
+    # (state, reasons, severity, hint, actions, min_restarts). Hints are logged with
+    # the fields container, namespace, pod, reason, message, image, exit_code and
+    # restart_count, once the container restarted at least min_restarts times
+    RULES = [
+        (
+            "terminated",
+            ["OOMKilled"],
+            "warning",
+            "Please check resource allocation. Container %(container)s in pod "
+            "%(namespace)s/%(pod)s termination reason: OOMKilled.  Message: %(message)s",
+            [],
+            0,
+        ),
+        (
+            "terminated",
+            ["ContainerCannotRun"],
+            "warning",
+            "Please check configurations inside the container image. Container "
+            "%(container)s in pod %(namespace)s/%(pod)s termination reason: "
+            "ContainerCannotRun. Message: %(message)s",
+            [],
+            0,
+        ),
+        (
+            "terminated",
+            ["DeadlineExceeded"],
+            "warning",
+            "Timeout may be the possible reason. Container %(container)s in pod "
+            "%(namespace)s/%(pod)s termination reason: DeadlineExceeded.  Message: "
+            "%(message)s",
+            [],
+            0,
+        ),
+        (
+            "terminated",
+            ["Error", "StartError"],
+            "warning",
+            "Issue in container image. Container %(container)s in pod "
+            "%(namespace)s/%(pod)s termination reason: %(reason)s. Message: %(message)s",
+            [],
+            0,
+        ),
+        (
+            "terminated",
+            ["Completed"],
+            "info",
+            "Container %(container)s in pod %(namespace)s/%(pod)s completed its run and "
+            "shut down.",
+            [],
+            0,
+        ),
+        # container first goes in ErrImagePull and then ImagePullBackOff state
+        (
+            "waiting",
+            ["ImagePullBackOff", "ErrImagePull", "ErrImageNeverPull"],
+            "warning",
+            "Failed pulling the image %(image)s for container %(container)s in pod "
+            "%(namespace)s/%(pod)s. Message: %(message)s",
+            ["image_pull"],
+            0,
+        ),
+        (
+            "waiting",
+            ["RegistryUnavailable"],
+            "warning",
+            "Unable to connect to the image registry for container %(container)s.",
+            [],
+            0,
+        ),
+        (
+            "waiting",
+            ["InvalidImageName"],
+            "warning",
+            "Invalid image name %(image)s for container %(container)s in pod "
+            "%(namespace)s/%(pod)s. Message: %(message)s",
+            [],
+            0,
+        ),
+        # missing secrets or configmaps of env/envFrom end up here
+        (
+            "waiting",
+            ["CreateContainerConfigError"],
+            "warning",
+            "Unable to create the container configuration used by kubelet. Error "
+            "creating container %(container)s in pod %(namespace)s/%(pod)s.  Message: "
+            "%(message)s",
+            ["references"],
+            0,
+        ),
+        (
+            "waiting",
+            ["RunContainerError", "CreateContainerError"],
+            "warning",
+            "Possible issues: Mounting a not-existent volume e.g. ConfigMap or Secrets, "
+            "Mounting a read-only volume as read-write. Error while creating the "
+            "container %(container)s in pod %(namespace)s/%(pod)s. Message: %(message)s",
+            ["references"],
+            0,
+        ),
+        (
+            "waiting",
+            ["ContainerCreating"],
+            "warning",
+            "Possibly awaiting for some other condition. Container %(container)s is "
+            "creating in pod %(namespace)s/%(pod)s. Message: %(message)s",
+            [],
+            0,
+        ),
+        (
+            "waiting",
+            ["CrashLoopBackOff", "ImageInspectError"],
+            "warning",
+            "Possible reason for %(reason)s status of Container %(container)s in pod "
+            "%(namespace)s/%(pod)s: misconfigured container image, error in the "
+            "application or Health probes failed too many times. Restart count: "
+            "%(restart_count)s.",
+            ["logs"],
+            3,
+        ),
+        (
+            "waiting",
+            ["NetworkPluginNotReady"],
+            "warning",
+            "Network plugin not ready.",
+            [],
+            0,
+        ),
+        (
+            "waiting",
+            ["DockerDaemonNotReady"],
+            "warning",
+            "Docker daemon not ready.",
+            [],
+            0,
+        ),
+        (
+            "waiting",
+            ["PreStartHookError"],
+            "warning",
+            "preStart hook execution error for container %(container)s in pod "
+            "%(namespace)s/%(pod)s. Message: %(message)s",
+            [],
+            0,
+        ),
+        (
+            "waiting",
+            ["PostStartHookError"],
+            "warning",
+            "postStart hook execution error for container %(container)s in pod "
+            "%(namespace)s/%(pod)s. Message: %(message)s",
+            [],
+            0,
+        ),
+    ]
+
+    # severity of reasons without a rule, hint and actions are skipped for them
+    DEFAULT_SEVERITY = "warning"
+
+    REGISTRY = {}
+
+    @classmethod
+    def register(cls, state, reasons, severity, hint, actions=(), min_restarts=0):
+        """[Add a rule for reasons of a container state, replacing earlier ones]
+
+        Args:
+            state ([str]): [waiting|terminated]
+            reasons ([list]): [Exact reasons reported by kubelet]
+            severity ([str]): [Severity of the finding]
+            hint ([str]): [Message logged with %(field)s placeholders]
+            actions ([list]): [Follow-up checks from ACTIONS]
+            min_restarts ([int]): [Restarts of the container before the hint is logged]
+        """
+        if severity not in cls.SEVERITIES:
+            raise ValueError("Unknown severity %s of %s rule." % (severity, state))
+        unknown = set(actions) - set(cls.ACTIONS)
+        if unknown:
+            raise ValueError(
+                "Unknown actions %s of %s rule." % (", ".join(sorted(unknown)), state)
+            )
+        rule = (severity, hint, tuple(actions), min_restarts)
+        for reason in reasons:
+            cls.REGISTRY[(state, reason)] = rule
+
+    @classmethod
+    def lookup(cls, state, reason):
+        """[Rule of a container state reason]
+
+        Args:
+            state ([str]): [waiting|terminated]
+            reason ([str]): [Reason reported by kubelet]
+
+        Returns:
+            [tuple]: [Severity, hint, actions and min_restarts, hint is None without a
+                rule]
+        """
+        return cls.REGISTRY.get((state, reason)) or (
+            cls.DEFAULT_SEVERITY,
+            None,
+            (),
+            0,
+        )
+
+
+for _rule in ContainerRules.RULES:
+    ContainerRules.register(*_rule)
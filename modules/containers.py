@@ -1,6 +1,9 @@
 """[Module to process pod containers]"""
-import kubernetes.client
-from kubernetes.client.rest import ApiException
+from .container_rules import ContainerRules
+from .snapshot import ClusterSnapshot
+from .findings import FindingSink
+from .log_collector import LogCollector
+from .log_scanner import LogScan
 
 
 class ContainerWrench:
@@ -8,128 +11,383 @@ class ContainerWrench:
     Check pod's container status and log details
     """
 
-    def __init__(self, k8s_config, namespace, logger):
-        self.k8s_config = k8s_config
+    def __init__(
+        self, kube_client, namespace, logger, snapshot=None, sink=None, collector=None
+    ):
+        self.kube_client = kube_client
         self.namespace = namespace
         self.logger = logger
-        with kubernetes.client.ApiClient(k8s_config) as api_client:
-            self.core = kubernetes.client.CoreV1Api(api_client)
+        self.snapshot = snapshot or ClusterSnapshot(kube_client, logger)
+        self.sink = sink or FindingSink()
+        self.collector = collector or LogCollector(kube_client)
+        # containers whose logs are fetched together once the pods are checked
+        self.log_targets = []
+        self.core = kube_client.core
+
+    @staticmethod
+    def pod_references(pod):
+        """[Secrets and configmaps referenced by a pod]
+
+        Args:
+            pod ([dict]): [Pod details in dict]
+
+        Returns:
+            [dict]: [secrets/configmaps to referenced name and (source, optional)]
+        """
+        refs = {"secrets": {}, "configmaps": {}}
+
+        def add(kind, ref, name, source):
+            if ref and name and name not in refs[kind]:
+                refs[kind][name] = (source, bool(getattr(ref, "optional", False)))
+
+        for volume in pod.spec.volumes or []:
+            source = "volume " + volume.name
+            if volume.secret:
+                add("secrets", volume.secret, volume.secret.secret_name, source)
+            if volume.config_map:
+                add("configmaps", volume.config_map, volume.config_map.name, source)
+            if volume.projected:
+                for projection in volume.projected.sources or []:
+                    if projection.secret:
+                        add("secrets", projection.secret, projection.secret.name, source)
+                    if projection.config_map:
+                        add(
+                            "configmaps",
+                            projection.config_map,
+                            projection.config_map.name,
+                            source,
+                        )
+        for cont in (pod.spec.init_containers or []) + (pod.spec.containers or []):
+            source = "container " + cont.name
+            for env_from in cont.env_from or []:
+                if env_from.secret_ref:
+                    add("secrets", env_from.secret_ref, env_from.secret_ref.name, source)
+                if env_from.config_map_ref:
+                    add(
+                        "configmaps",
+                        env_from.config_map_ref,
+                        env_from.config_map_ref.name,
+                        source,
+                    )
+            for env in cont.env or []:
+                if not env.value_from:
+                    continue
+                secret_ref = env.value_from.secret_key_ref
+                configmap_ref = env.value_from.config_map_key_ref
+                if secret_ref:
+                    add("secrets", secret_ref, secret_ref.name, source)
+                if configmap_ref:
+                    add("configmaps", configmap_ref, configmap_ref.name, source)
+        return refs
+
+    def reference_status(self, pod, kind, names, label, prefix):
+        """[Check that the secrets or configmaps referenced by a pod exist]
+
+        Args:
+            pod ([dict]): [Pod details in dict]
+            kind ([str]): [secrets|configmaps]
+            names ([set]): [Names of the kind in the namespace, None if unknown]
+            label ([str]): [Kind name used in logs and findings, e.g. Secret]
+            prefix ([str]): [Status prefix, e.g. SECRET]
+
+        Returns:
+            [list]: [Existence findings of the references]
+        """
+        findings = []
+        refs = ContainerWrench.pod_references(pod)[kind]
+        if refs and names is None:
+            self.logger.warning(
+                "Could not check %s %s of pod %s/%s.",
+                len(refs),
+                kind,
+                self.namespace,
+                pod.metadata.name,
+            )
+            return findings
+        for name, (source, optional) in refs.items():
+            found = name in names
+            if found:
+                self.logger.info(
+                    "%s %s found for pod: %s/%s ",
+                    label,
+                    name,
+                    self.namespace,
+                    pod.metadata.name,
+                )
+            elif optional:
+                self.logger.info(
+                    "Optional %s %s referenced by %s not found for pod: %s/%s ",
+                    label.lower(),
+                    name,
+                    source,
+                    self.namespace,
+                    pod.metadata.name,
+                )
+            else:
+                self.logger.warning(
+                    "%s %s referenced by %s not found for pod: %s/%s ",
+                    label,
+                    name,
+                    source,
+                    self.namespace,
+                    pod.metadata.name,
+                )
+            findings.append(
+                self.sink.report(
+                    self.namespace,
+                    label,
+                    name,
+                    "container_%s_status" % label.lower(),
+                    prefix + ("_FOUND" if found else "_NOT_FOUND"),
+                    "info" if found or optional else "warning",
+                    "%s %s of pod %s referenced by %s %s."
+                    % (
+                        label,
+                        name,
+                        pod.metadata.name,
+                        source,
+                        "found" if found else "not found",
+                    ),
+                )
+            )
+        return findings
 
     def container_secret_status(self, pod):
-        """[Get status of all secrets in a container]
+        """[Get status of all secrets referenced by a pod]
 
         Args:
             pod ([dict]): [Pod details in dict]
 
         Returns:
-            [list]: [Secret status for the pod]
+            [list]: [Secret status findings for the pod]
         """
         self.logger.debug("Checking pod %s secrets.", pod.metadata.name)
-        pod_secret_chk_result, sec_chk = [], ""
-        if pod.spec.volumes:
-            for volume in pod.spec.volumes:
-                if volume.secret:
-                    secret_name = volume.secret.secret_name
-                    self.logger.info(
-                        "Checking secret %s existence for pod: %s/%s ",
-                        secret_name,
-                        self.namespace,
-                        pod.metadata.name,
-                    )
-                    secret_list = self.core.read_namespaced_secret(
-                        secret_name, self.namespace
-                    )
-                    for secret in secret_list.items:
-                        if secret.metadata.name == secret_name:
-                            self.logger.info(
-                                "Secret %s found for pod: %s/%s ",
-                                secret_name,
-                                self.namespace,
-                                pod.metadata.name,
-                            )
-                            sec_chk = "SECRET_FOUND"
-                            break
-                    pod_secret_chk_result.append(
-                        [pod.metadata.name, secret_name, sec_chk]
-                    )
-        return pod_secret_chk_result
+        return self.reference_status(
+            pod, "secrets", self.snapshot.secret_names(self.namespace), "Secret", "SECRET"
+        )
 
     def container_configmap_status(self, pod):
-        """[Get status of all configmaps in a container]
+        """[Get status of all configmaps referenced by a pod]
 
         Args:
             pod ([dict]): [Pod details in dict]
 
         Returns:
-            [list]: [Configmap status for the pod]
+            [list]: [Configmap status findings for the pod]
         """
-        pod_configmap_chk_result, cm_chk = [], ""
-        if pod.spec.volumes:
-            for volume in pod.spec.volumes:
-                if volume.config_map:
-                    configmap_name = volume.config_map.name
-                    self.logger.info(
-                        "Checking configmap %s status for pod: %s/%s ",
-                        configmap_name,
+        self.logger.debug("Checking pod %s configmaps.", pod.metadata.name)
+        return self.reference_status(
+            pod,
+            "configmaps",
+            self.snapshot.configmap_names(self.namespace),
+            "ConfigMap",
+            "CONFIGMAP",
+        )
+
+    def queue_container_logs(self, pod, container):
+        """[Queue logs of a container to be fetched by container_logs]
+
+        Args:
+            pod ([dict]): [Pod details in dict]
+            container ([dict]): [Container status details in dict]
+        """
+        self.log_targets.append((self.namespace, pod.metadata.name, container.name, False))
+        # logs of the previous run only exist if the container was restarted
+        if container.restart_count or (
+            container.last_state and container.last_state.terminated
+        ):
+            self.log_targets.append(
+                (self.namespace, pod.metadata.name, container.name, True)
+            )
+
+    def container_logs(self):
+        """[Fetch logs of all queued containers concurrently and classify their root cause]
+
+        Returns:
+            [list]: [Log root cause findings, one per container]
+        """
+        if not self.log_targets:
+            return []
+        if self.snapshot.offline:
+            self.logger.info(
+                "Skipping logs of %s containers in namespace %s in offline mode.",
+                len(self.log_targets),
+                self.namespace,
+            )
+            self.log_targets = []
+            return []
+        self.logger.debug(
+            "Fetching %s container logs in namespace %s.",
+            len(self.log_targets),
+            self.namespace,
+        )
+        results = self.collector.collect(self.log_targets, self.logger)
+        self.log_targets = []
+        container_scans = {}
+        for (_, pod_name, container_name, previous), scan in results.items():
+            container_scans.setdefault((pod_name, container_name), {})[previous] = scan
+        findings = []
+        for (pod_name, container_name), scans in container_scans.items():
+            if not any(scans.values()):
+                self.logger.error(
+                    "Could not read logs for %s/%s container %s in current or "
+                    "previous run.",
+                    self.namespace,
+                    pod_name,
+                    container_name,
+                )
+                continue
+            for previous, scan in sorted(scans.items()):
+                if scan and scan.tail:
+                    self.logger.debug(
+                        "Last logs of pod %s/%s container %s%s:\n%s",
                         self.namespace,
-                        pod.metadata.name,
+                        pod_name,
+                        container_name,
+                        " (previous run)" if previous else "",
+                        "\n".join(scan.tail),
                     )
-                    configmap_list = self.core.read_namespaced_config_map(
-                        configmap_name, self.namespace
+            # the previous run usually holds the crash, its matches are ranked first
+            merged = LogScan()
+            for previous in (True, False):
+                if scans.get(previous):
+                    merged.merge(scans[previous])
+            root_cause = merged.root_cause()
+            name = "%s/%s" % (pod_name, container_name)
+            if root_cause:
+                signature, hint, line = root_cause
+                self.logger.warning(
+                    "Root cause from logs of container %s in pod %s/%s: %s. %s "
+                    "Matched line: %s",
+                    container_name,
+                    self.namespace,
+                    pod_name,
+                    signature,
+                    hint,
+                    line,
+                )
+                findings.append(
+                    self.sink.report(
+                        self.namespace,
+                        "Container",
+                        name,
+                        "container_log_root_cause",
+                        "LOG_" + signature.upper(),
+                        "warning",
+                        "%s Matched line: %s" % (hint, line),
                     )
-                    for configmap in configmap_list.items:
-                        if configmap.metadata.name == configmap_name:
-                            self.logger.info(
-                                "Configmap %s found for pod: %s/%s ",
-                                configmap_name,
-                                self.namespace,
-                                pod.metadata.name,
-                            )
-                            cm_chk = "CONFIGMAP_FOUND"
-                            break
-                    pod_configmap_chk_result.append(
-                        [pod.metadata.name, configmap_name, cm_chk]
+                )
+            else:
+                self.logger.info(
+                    "No known failure signature in %s log lines of container %s in "
+                    "pod %s/%s.",
+                    merged.lines,
+                    container_name,
+                    self.namespace,
+                    pod_name,
+                )
+                findings.append(
+                    self.sink.report(
+                        self.namespace,
+                        "Container",
+                        name,
+                        "container_log_root_cause",
+                        "LOG_UNCLASSIFIED",
+                        "info",
+                        "No known failure signature in %s log lines." % merged.lines,
                     )
-        return pod_configmap_chk_result
+                )
+        return findings
 
-    def get_container_logs(self, pod_name, container_name):
-        """[Get logs of a pod]
+    def image_pull_status(self, container, pod):
+        """[Check image pull secrets and pull policy of a container failing to pull]
 
         Args:
-            pod_name ([string]): [Pod name]
-            container_name ([string]): [Container name running in the pod]
+            container ([dict]): [Container status details in dict]
+            pod ([dict]): [Pod details in dict]
 
         Returns:
-            [string]: [Logs of the pod]
+            [list]: [Image pull findings, the checks only log]
         """
-        try:
-            self.logger.debug("Fetching logs for pod %s/%s.", self.namespace, pod_name)
-            logs = self.core.read_namespaced_pod_log(
-                pod_name,
+        if not pod.spec.image_pull_secrets:
+            self.logger.warning(
+                "No image pull secrets defined for pod %s/%s.",
                 self.namespace,
-                container=container_name,
-                follow=False,
-                tail_lines=10,
+                pod.metadata.name,
             )
-            if not logs:
-                logs = self.core.read_namespaced_pod_log(
-                    pod_name,
-                    self.namespace,
-                    container=container_name,
-                    previous="previous",
-                    follow=False,
-                    tail_lines=10,
+        for cont in pod.spec.containers:
+            if cont.name == container.name and cont.image_pull_policy == "Never":
+                self.logger.warning(
+                    "Image pull policy is set to %s for container %s",
+                    cont.image_pull_policy,
+                    cont.name,
                 )
-            self.logger.info("Logs for pod %s/%s: %s", self.namespace, pod_name, logs)
-        except ApiException as exp:
-            self.logger.error(
-                "Could not read logs for %s/%s in current or previous run. Exception: %s",
-                self.namespace,
-                pod_name,
-                exp.reason,
+        return []
+
+    def reference_statuses(self, container, pod):
+        """[Check secrets and configmaps of a container failing to be created]
+
+        Args:
+            container ([dict]): [Container status details in dict]
+            pod ([dict]): [Pod details in dict]
+
+        Returns:
+            [list]: [Secret and configmap status findings for the pod]
+        """
+        return self.container_secret_status(pod) + self.container_configmap_status(pod)
+
+    def queue_logs(self, container, pod):
+        """[Queue logs of a failing container for the root cause scan]
+
+        Args:
+            container ([dict]): [Container status details in dict]
+            pod ([dict]): [Pod details in dict]
+
+        Returns:
+            [list]: [No findings, logs are classified by container_logs]
+        """
+        self.queue_container_logs(pod, container)
+        return []
+
+    # follow-up actions of ContainerRules to the checks running them
+    ACTIONS = {
+        "image_pull": image_pull_status,
+        "references": reference_statuses,
+        "logs": queue_logs,
+    }
+
+    def apply_rule(self, rule, reason, container, pod, fields):
+        """[Log the hint of a container state reason and run its follow-up checks]
+
+        Args:
+            rule ([tuple]): [Severity, hint, actions and min_restarts from
+                ContainerRules.lookup]
+            reason ([str]): [Reason reported by kubelet]
+            container ([dict]): [Container status details in dict]
+            pod ([dict]): [Pod details in dict]
+            fields ([dict]): [Fields of the hint other than container, pod and reason]
+
+        Returns:
+            [list]: [Findings of the follow-up checks]
+        """
+        severity, hint, actions, min_restarts = rule
+        if hint and container.restart_count >= min_restarts:
+            fields.update(
+                container=container.name,
+                namespace=self.namespace,
+                pod=pod.metadata.name,
+                reason=reason,
+                image=container.image,
+                restart_count=container.restart_count,
             )
-            logs = None
-        return logs
+            if severity == "info":
+                self.logger.info(hint, fields)
+            else:
+                self.logger.warning(hint, fields)
+        findings = []
+        for action in actions:
+            findings += ContainerWrench.ACTIONS[action](self, container, pod)
+        return findings
 
     def container_terminated(self, container, pod):
         """[Check if the container is terminated]
@@ -138,67 +396,38 @@ class ContainerWrench:
             pod ([dict]): [Pod details in dict]
             container ([dict]): [Container details in dict]
         Returns:
-            [bool]: [True if the container is terminated]
+            [list]: [Termination findings of the container]
         """
-        try:
-            if container.state.terminated:
-                self.logger.warning(
-                    "Container %s terminated at %s due to %s with exit code: %s.",
-                    container.name,
-                    container.state.terminated.finished_at,
-                    container.state.terminated.reason,
-                    container.state.terminated.exit_code,
-                )
-                if "OOMKilled" in container.state.terminated.reason:
-                    self.logger.warning(
-                        "Please check resource allocation. Container %s in pod %s/%s "
-                        "termination reason: OOMKilled.  Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.terminated.message,
-                    )
-                if "ContainerCannotRun" in container.state.terminated.reason:
-                    self.logger.warning(
-                        "Please check configurations inside the container image. Container %s in "
-                        "pod %s/%s termination reason: ContainerCannotRun. Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.terminated.message,
-                    )
-                if "DeadlineExceeded" in container.state.terminated.reason:
-                    self.logger.warning(
-                        "Timeout may be the possible reason. Container %s in pod %s/%s"
-                        " termination reason: DeadlineExceeded.  Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.terminated.message,
-                    )
-                if "Error" in container.state.terminated.reason:
-                    self.logger.warning(
-                        "Issue in container image. Container %s in pod %s/%s "
-                        "termination reason: Error. Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.terminated.message,
-                    )
-                if "Completed" in container.state.terminated.reason:
-                    self.logger.info(
-                        "Container %s in pod %s/%s completed its run and shut down.",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                    )
-        except KeyError:
-            self.logger.warning(
-                "Container %s is in Unknown state for pod %s/%s.",
-                container.name,
+        terminated = container.state.terminated
+        if not terminated:
+            return []
+        self.logger.warning(
+            "Container %s terminated at %s due to %s with exit code: %s.",
+            container.name,
+            terminated.finished_at,
+            terminated.reason,
+            terminated.exit_code,
+        )
+        rule = ContainerRules.lookup("terminated", terminated.reason)
+        findings = [
+            self.sink.report(
                 self.namespace,
-                pod.metadata.name,
+                "Container",
+                pod.metadata.name + "/" + container.name,
+                "container_terminated",
+                terminated.reason,
+                rule[0],
+                "Container terminated with exit code %s. Message: %s"
+                % (terminated.exit_code, terminated.message),
             )
+        ]
+        return findings + self.apply_rule(
+            rule,
+            terminated.reason,
+            container,
+            pod,
+            {"message": terminated.message, "exit_code": terminated.exit_code},
+        )
 
     def container_waiting(self, container, pod):
         """[Check if the container is waiting]
@@ -206,145 +435,51 @@ class ContainerWrench:
         Args:
             container ([type]): [Container details in dict]
             pod ([type]): [Pod details in dict]
+
+        Returns:
+            [list]: [Waiting findings of the container]
         """
-        try:
-            if container.state.waiting:
-                self.logger.warning(
-                    "Container %s waiting in %s status. Restart count: %s.",
-                    container.name,
-                    container.state.waiting.reason,
-                    container.restart_count,
-                )
-                # container first goes in ErrImagePull and then ImagePullBackOff state
-                if container.state.waiting.reason in [
-                    "ImagePullBackOff",
-                    "ErrImagePull",
-                    "ErrImageNeverPull",
-                ]:
-                    self.logger.warning(
-                        "Failed pulling the image %s for container %s in pod %s/%s. Message: %s",
-                        container.image,
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.waiting.message,
-                    )
-                    if not pod.spec.image_pull_secrets:
-                        self.logger.warning(
-                            "No image pull secrets defined for pod %s/%s.",
-                            self.namespace,
-                            pod.metadata.name,
-                        )
-                    for cont in pod.spec.containers:
-                        if (
-                            cont.name in container.name
-                            and "Never" in cont.image_pull_policy
-                        ):
-                            self.logger.warning(
-                                "Image pull policy is set to %s for container %s",
-                                cont.image_pull_policy,
-                                cont.name,
-                            )
-                if "RegistryUnavailable" in container.state.waiting.reason:
-                    self.logger.warning(
-                        "Unable to connect to the image registry for container %s.",
-                        container.name,
-                    )
-                if "InvalidImageName" in container.state.waiting.reason:
-                    self.logger.warning(
-                        "Invalid image name %s for container %s in pod %s/%s. Message: %s",
-                        container.image,
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.waiting.message,
-                    )
-                if "CreateContainerConfigError" in container.state.waiting.reason:
-                    self.logger.warning(
-                        "Unable to create the container configuration used by kubelet. "
-                        "Error creating container %s in pod %s/%s.  Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.waiting.message,
-                    )
-                if container.state.waiting.reason in [
-                    "RunContainerError",
-                    "CreateContainerError",
-                ]:
-                    self.logger.warning(
-                        "Possible issues: Mounting a not-existent volume e.g. ConfigMap or Secrets"
-                        ", Mounting a read-only volume as read-write. Error while creating the "
-                        "container %s in pod %s/%s. Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.waiting.message,
-                    )
-                    ContainerWrench.container_secret_status(self, pod)
-                    ContainerWrench.container_configmap_status(self, pod)
-                if "ContainerCreating" in container.state.waiting.reason:
-                    self.logger.warning(
-                        "Possibly awaiting for some other condition. Container %s is "
-                        "creating in pod %s/%s. Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.waiting.message,
-                    )
-                if container.state.waiting.reason in [
-                    "ImageInspectError",
-                    "CrashLoopBackOff",
-                ]:
-                    if container.restart_count > 2:
-                        self.logger.warning(
-                            "Possible reason for CrashLoopBackOff status of Container %s in pod "
-                            "%s/%s: misconfigured container image, error in the application or "
-                            "Health probes failed too many times.",
-                            container.name,
-                            self.namespace,
-                            pod.metadata.name,
-                        )
-                    ContainerWrench.get_container_logs(
-                        self, pod.metadata.name, container.name
-                    )
-                if "NetworkPluginNotReady" in container.state.waiting.reason:
-                    self.logger.warning("Network plugin not ready.")
-                if "DockerDaemonNotReady" in container.state.waiting.reason:
-                    self.logger.warning("Docker daemon not ready.")
-                if "PreStartHookError" in container.state.waiting.reason:
-                    self.logger.warning(
-                        "preStart hook execution error for container %s in pod "
-                        "%s/%s. Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.waiting.message,
-                    )
-                if "PostStartHookError" in container.state.waiting.reason:
-                    self.logger.warning(
-                        "postStart hook execution error for container %s in pod "
-                        "%s/%s. Message: %s",
-                        container.name,
-                        self.namespace,
-                        pod.metadata.name,
-                        container.state.waiting.message,
-                    )
-        except KeyError:
-            self.logger.warning(
-                "Container %s is in Unknown state for pod %s/%s.",
-                container.name,
+        waiting = container.state.waiting
+        if not waiting:
+            return []
+        self.logger.warning(
+            "Container %s waiting in %s status. Restart count: %s.",
+            container.name,
+            waiting.reason,
+            container.restart_count,
+        )
+        rule = ContainerRules.lookup("waiting", waiting.reason)
+        findings = [
+            self.sink.report(
                 self.namespace,
-                pod.metadata.name,
+                "Container",
+                pod.metadata.name + "/" + container.name,
+                "container_waiting",
+                waiting.reason,
+                rule[0],
+                "Container waiting with restart count %s. Message: %s"
+                % (container.restart_count, waiting.message),
             )
+        ]
+        return findings + self.apply_rule(
+            rule,
+            waiting.reason,
+            container,
+            pod,
+            {"message": waiting.message, "exit_code": None},
+        )
 
     def container_wrench(self, pod):
         """[Get status of containers configured in a pod]
 
         Args:
             pod ([dict]): [Pod object]
+
+        Returns:
+            [list]: [Container findings of the pod]
         """
         pod_cont_status = pod.status.container_statuses
+        findings = []
         try:
             for container in pod_cont_status:
                 if container.ready:
@@ -361,12 +496,26 @@ class ContainerWrench:
                         self.namespace,
                         pod.metadata.name,
                     )
+                    findings.append(
+                        self.sink.report(
+                            self.namespace,
+                            "Container",
+                            pod.metadata.name + "/" + container.name,
+                            "container_wrench",
+                            "NOT_READY",
+                            "warning",
+                            "Container is in NotReady state.",
+                        )
+                    )
                     # https://main.qcloudimg.com/raw/document/intl/product/pdf/457_35659_en.pdf
-                    ContainerWrench.container_terminated(self, container, pod)
-                    ContainerWrench.container_waiting(self, container, pod)
+                    findings += ContainerWrench.container_terminated(
+                        self, container, pod
+                    )
+                    findings += ContainerWrench.container_waiting(self, container, pod)
         except TypeError:
             self.logger.warning(
                 "No running containers found in pod %s/%s.",
                 self.namespace,
                 pod.metadata.name,
             )
+        return findings
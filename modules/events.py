@@ -0,0 +1,132 @@
+"""[Module to index events by the object they are about]"""
+import heapq
+import itertools
+
+
+class EventIndex:
+    """
+    Keep the newest events of every involved object for constant time lookups
+    """
+
+    def __init__(self, max_events=10):
+        self.max_events = max_events
+        self.events = {}
+        self.counter = itertools.count()
+
+    @staticmethod
+    def event_time(event):
+        """[Time the event was last seen]
+
+        Args:
+            event ([dict]): [Event object]
+
+        Returns:
+            [float]: [Epoch seconds, 0 if event has no timestamp]
+        """
+        timestamp = (
+            event.last_timestamp or event.event_time or event.metadata.creation_timestamp
+        )
+        return timestamp.timestamp() if timestamp else 0
+
+    @staticmethod
+    def object_key(event):
+        """[Key of the object an event is about]"""
+        obj = event.involved_object
+        return (obj.kind, obj.namespace, obj.name)
+
+    @staticmethod
+    def same_event(entry, event):
+        """[Check if an index entry holds a version of the event, by uid or name]"""
+        indexed = entry[2].metadata
+        if indexed.uid and event.metadata.uid:
+            return indexed.uid == event.metadata.uid
+        return (indexed.namespace, indexed.name) == (
+            event.metadata.namespace,
+            event.metadata.name,
+        )
+
+    def add(self, event):
+        """[Add or replace an event, dropping the oldest one of its object above
+        max_events]
+
+        Args:
+            event ([dict]): [Event object]
+        """
+        key = self.object_key(event)
+        # counter breaks ties so events themselves are never compared
+        entry = (self.event_time(event), next(self.counter), event)
+        obj_events = self.events.setdefault(key, [])
+        if any(self.same_event(old, event) for old in obj_events):
+            # a repeated event is updated in place instead of filling the heap
+            obj_events[:] = [
+                old for old in obj_events if not self.same_event(old, event)
+            ]
+            heapq.heapify(obj_events)
+        if len(obj_events) < self.max_events:
+            heapq.heappush(obj_events, entry)
+        else:
+            heapq.heappushpop(obj_events, entry)
+
+    def remove(self, event):
+        """[Remove a deleted event, and its object once it has no events left]
+
+        Args:
+            event ([dict]): [Event object]
+        """
+        key = self.object_key(event)
+        obj_events = [
+            entry
+            for entry in self.events.get(key, [])
+            if not self.same_event(entry, event)
+        ]
+        if obj_events:
+            heapq.heapify(obj_events)
+            self.events[key] = obj_events
+        else:
+            self.events.pop(key, None)
+
+    def discard(self, kind, namespace, name):
+        """[Drop events of a deleted object]
+
+        Args:
+            kind ([str]): [Involved object kind]
+            namespace ([str]): [Involved object namespace]
+            name ([str]): [Involved object name]
+        """
+        self.events.pop((kind, namespace, name), None)
+
+    def known(self, event):
+        """[Check if this version of an event is in the index]
+
+        Args:
+            event ([dict]): [Event object]
+
+        Returns:
+            [bool]: [True if an event with the same uid and resource version is indexed]
+        """
+        return any(
+            self.same_event(entry, event)
+            and entry[2].metadata.resource_version == event.metadata.resource_version
+            for entry in self.events.get(self.object_key(event), [])
+        )
+
+    def lookup(self, kind, namespace, name, uid=None):
+        """[Get events of an object, newest first]
+
+        Args:
+            kind ([str]): [Involved object kind]
+            namespace ([str]): [Involved object namespace]
+            name ([str]): [Involved object name]
+            uid ([str]): [Involved object uid, skips events of older objects with same name]
+
+        Returns:
+            [list]: [Events of the object]
+        """
+        obj_events = self.events.get((kind, namespace, name), [])
+        return [
+            event
+            for _, _, event in sorted(obj_events, reverse=True)
+            if not uid
+            or not event.involved_object.uid
+            or event.involved_object.uid == uid
+        ]
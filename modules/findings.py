@@ -0,0 +1,97 @@
+"""[Module for structured findings of the checks]"""
+import json
+import threading
+
+
+class Finding:
+    """
+    Compact record of one check result
+    """
+
+    __slots__ = ("namespace", "kind", "name", "check", "status", "severity", "message")
+
+    def __init__(self, namespace, kind, name, check, status, severity, message):
+        self.namespace = namespace
+        self.kind = kind
+        self.name = name
+        self.check = check
+        self.status = status
+        self.severity = severity
+        self.message = message
+
+    def __repr__(self):
+        return "Finding(%s)" % ", ".join(
+            "%s=%r" % (field, getattr(self, field)) for field in self.__slots__
+        )
+
+    @property
+    def key(self):
+        """[Identity of the finding, without its message]"""
+        return (self.namespace, self.kind, self.name, self.check, self.status)
+
+    def to_dict(self):
+        """[Finding as dict]"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class FindingSink:
+    """
+    Stream findings as NDJSON lines as soon as they are produced
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.counts = {}
+        # set to a list to collect findings, e.g. to compare two runs of a check
+        self.collected = None
+        # fields added to every line, e.g. the cluster of the finding
+        self.labels = {}
+
+    def labelled(self, **labels):
+        """[Sink writing to the same stream with labels added to each finding]
+
+        Args:
+            labels ([dict]): [Fields added to every line, e.g. cluster]
+
+        Returns:
+            [FindingSink]: [Labelled sink with its own counts]
+        """
+        sink = FindingSink(self.stream)
+        # lines of all labelled sinks are written one at a time
+        sink.lock = self.lock
+        sink.labels = dict(self.labels, **labels)
+        return sink
+
+    def emit(self, finding, **extra):
+        """[Write a finding as one JSON line]
+
+        Args:
+            finding ([Finding]): [Finding to write]
+            extra ([dict]): [Additional fields of the JSON line]
+
+        Returns:
+            [Finding]: [Finding written]
+        """
+        with self.lock:
+            count_key = (finding.check, finding.severity)
+            self.counts[count_key] = self.counts.get(count_key, 0) + 1
+            if self.collected is not None:
+                self.collected.append(finding)
+            if self.stream:
+                line = finding.to_dict()
+                line.update(self.labels)
+                line.update(extra)
+                self.stream.write(json.dumps(line, default=str) + "\n")
+                self.stream.flush()
+        return finding
+
+    def report(self, namespace, kind, name, check, status, severity, message):
+        """[Build a finding and write it]
+
+        Returns:
+            [Finding]: [Finding written]
+        """
+        return self.emit(
+            Finding(namespace, kind, name, check, status, severity, message)
+        )
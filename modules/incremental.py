@@ -0,0 +1,258 @@
+"""[Module to diagnose only what changed since the previous run]"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+from urllib3.exceptions import ReadTimeoutError
+from .findings import Finding
+from .watch import WatchWrench
+
+
+class IncrementalWrench(WatchWrench):
+    """
+    Resume watches from the resource versions of the previous run, check the objects
+    which changed and carry over findings of the others
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, *args, state_file=None, catch_up_seconds=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state_file = state_file
+        # the API server ends a resumed watch after this long, once it has sent
+        # every change since the resource version
+        self.catch_up_seconds = catch_up_seconds
+        self.checked = set()
+
+    def load_state(self):
+        """[Restore snapshot and findings of the previous run]
+
+        Returns:
+            [bool]: [True if the state file could be used]
+        """
+        if not os.path.exists(self.state_file):
+            self.logger.info("No state file %s. Running a full diagnosis.", self.state_file)
+            return False
+        try:
+            self.snapshot.restore(self.state_file, offline=False)
+        except (OSError, ValueError, KeyError) as exp:
+            self.logger.warning(
+                "Could not read state file %s: %s. Running a full diagnosis.",
+                self.state_file,
+                exp,
+            )
+            return False
+        state = self.snapshot.extra
+        if state.get("version") != self.STATE_VERSION or state.get(
+            "namespace"
+        ) != self.namespace:
+            self.logger.info(
+                "State file %s is from another version or namespace. Running a full "
+                "diagnosis.",
+                self.state_file,
+            )
+            return False
+        for item in state.get("findings", []):
+            self.findings[tuple(item["key"])] = {
+                finding.key: finding
+                for finding in (Finding(**fields) for fields in item["findings"])
+            }
+        return True
+
+    def save_state(self):
+        """[Save snapshot and findings for the next run]"""
+        self.snapshot.save(
+            self.state_file,
+            extra={
+                "version": self.STATE_VERSION,
+                "namespace": self.namespace,
+                "findings": [
+                    {
+                        "key": list(key),
+                        "findings": [finding.to_dict() for finding in tracked.values()],
+                    }
+                    for key, tracked in self.findings.items()
+                ],
+            },
+        )
+
+    def catch_up(self, kind, list_func, *args):
+        """[Get changes of a kind since the resource version of the previous run]
+
+        Args:
+            kind ([str]): [Resource kind]
+            list_func ([function]): [List function of the API]
+
+        Returns:
+            [tuple]: [RESUMED with watch events, RELIST with a fresh kind index, or
+                FAILED]
+        """
+        resource_version = self.snapshot.resource_versions.get(kind)
+        changes, received = [], False
+        try:
+            if not resource_version:
+                raise ApiException(status=410, reason="No resource version saved")
+            for event in watch.Watch().stream(
+                list_func,
+                *args,
+                resource_version=resource_version,
+                allow_watch_bookmarks=True,
+                timeout_seconds=self.catch_up_seconds,
+                _request_timeout=(10, self.catch_up_seconds + 10),
+            ):
+                received = True
+                if event["type"] == "ERROR":
+                    raise ApiException(
+                        status=event["raw_object"].get("code"),
+                        reason=event["raw_object"].get("message"),
+                    )
+                resource_version = event["object"].metadata.resource_version
+                if event["type"] != "BOOKMARK":
+                    changes.append((event["type"], event["object"]))
+        except ReadTimeoutError:
+            # the API server did not end the watch, changes are only known to be
+            # complete if it sent something before going quiet
+            if not received:
+                self.logger.warning("Resuming %s timed out before any data.", kind)
+                return "FAILED", None
+        except ApiException as exp:
+            if exp.status != 410:
+                self.logger.warning("Resuming %s failed: %s", kind, exp)
+                return "FAILED", None
+            # resource version is too old, list the kind again and compare
+            self.logger.info("Resource version of %s expired. Listing %s again.", kind, kind)
+            kind_index = self.snapshot.relist(kind, list_func, *args)
+            return ("RELIST", kind_index) if kind_index is not None else ("FAILED", None)
+        self.snapshot.resource_versions[kind] = resource_version
+        self.logger.debug("Resumed %s with %s changes.", kind, len(changes))
+        return "RESUMED", changes
+
+    def apply(self, kind, changes):
+        """[Apply changes of a kind to the snapshot]
+
+        Args:
+            kind ([str]): [Resource kind]
+            changes ([list]): [Watch events]
+
+        Returns:
+            [tuple]: [Pods (namespace, name) and namespaces whose checks are affected]
+        """
+        pods, namespaces = set(), set()
+        for event_type, resource in changes:
+            if event_type == "DELETED":
+                self.snapshot.delete(kind, resource)
+            else:
+                self.snapshot.upsert(kind, resource)
+            if kind == "pods":
+                pods.add((resource.metadata.namespace, resource.metadata.name))
+            elif kind == "events":
+                involved = resource.involved_object
+                if involved and involved.kind == "Pod":
+                    pods.add((involved.namespace, involved.name))
+            else:
+                namespaces.add(resource.metadata.namespace)
+        return pods, namespaces
+
+    def check_pods(self, namespace, pods):
+        """[Run checks of pods of a namespace once per run]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            pods ([list]): [Pod objects of the namespace]
+        """
+        unchecked = []
+        for pod in pods:
+            key = ("Pod", namespace, pod.metadata.name)
+            if key not in self.checked:
+                self.checked.add(key)
+                unchecked.append(pod)
+        if unchecked:
+            super().check_pods(namespace, unchecked)
+
+    def check_quota(self, namespace):
+        """[Run resource quota checks of a namespace once per run]
+
+        Args:
+            namespace ([str]): [Namespace name]
+        """
+        key = ("ResourceQuota", namespace, "all")
+        if key not in self.checked:
+            self.checked.add(key)
+            super().check_quota(namespace)
+
+    def incremental_diagnosis(self):
+        """[Catch up with changes since the previous run and check what they affect]"""
+        list_funcs = self.snapshot.list_funcs(self.namespace)
+        with ThreadPoolExecutor(max_workers=len(list_funcs)) as executor:
+            results = {
+                kind: executor.submit(self.catch_up, kind, *list_funcs[kind])
+                for kind in list_funcs
+            }
+        pods, pod_namespaces, quota_namespaces = set(), set(), set()
+        for kind, future in results.items():
+            status, result = future.result()
+            if status == "FAILED":
+                # checks of this kind can not be trusted, list it again
+                kind_index = self.snapshot.relist(kind, *list_funcs[kind])
+                if kind_index is None:
+                    continue
+                status, result = "RELIST", kind_index
+            changes = (
+                self.relist_changes(kind, result) if status == "RELIST" else result
+            )
+            kind_pods, namespaces = self.apply(kind, changes)
+            pods |= kind_pods
+            if kind == "resourcequotas":
+                quota_namespaces |= namespaces
+            else:
+                pod_namespaces |= namespaces
+        self.logger.info(
+            "%s pods, %s namespaces and %s quotas changed since the previous run.",
+            len(pods),
+            len(pod_namespaces),
+            len(quota_namespaces),
+        )
+        for namespace in sorted(pod_namespaces):
+            # service, ingress and PVC changes can affect every pod of the namespace
+            self.wrenches.pop(namespace, None)
+            self.check_pods(namespace, self.snapshot.pods(namespace).items)
+        changed_pods = {}
+        for namespace, name in sorted(pods):
+            pod = self.pod(namespace, name)
+            if pod:
+                changed_pods.setdefault(namespace, []).append(pod)
+            elif ("Pod", namespace, name) in self.findings:
+                self.track(("Pod", namespace, name), None)
+        for namespace, ns_pods in changed_pods.items():
+            self.check_pods(namespace, ns_pods)
+        for namespace in sorted(quota_namespaces):
+            self.check_quota(namespace)
+
+    def incremental_wrench(self):
+        """[Diagnose changes since the previous run and save state for the next one]"""
+        self.logger.info("Starting kube-wrench with state file %s.", self.state_file)
+        if self.load_state():
+            self.incremental_diagnosis()
+        else:
+            self.findings = {}
+            self.snapshot.load(self.namespace)
+            self.initial_diagnosis()
+        carried = 0
+        for key, tracked in sorted(self.findings.items()):
+            if key in self.checked:
+                continue
+            for finding in tracked.values():
+                carried += 1
+                self.logger.warning(
+                    "Unchanged finding for %s %s/%s: %s. %s",
+                    *key,
+                    finding.status,
+                    finding.message,
+                )
+                self.sink.emit(finding, state="unchanged")
+        self.logger.info(
+            "Checked %s pods and quotas, carried over %s findings of unchanged objects.",
+            len(self.checked),
+            carried,
+        )
+        self.save_state()
@@ -1,60 +1,142 @@
 """[Module to process ingress details]"""
-import kubernetes.client
-from kubernetes.client.rest import ApiException
-import requests
+from .prober import IngressProber
+from .snapshot import ClusterSnapshot
+from .findings import FindingSink
 
 
 class IngressWrench:
     """[Class to determine ingress status]"""
 
-    def __init__(self, k8s_config, namespace, logger):
-        self.k8s_config = k8s_config
+    def __init__(
+        self, kube_client, namespace, logger, snapshot=None, prober=None, sink=None
+    ):
+        self.kube_client = kube_client
         self.namespace = namespace
         self.logger = logger
-        with kubernetes.client.ApiClient(k8s_config) as api_client:
-            self.network = kubernetes.client.NetworkingV1Api(api_client)
+        self.snapshot = snapshot or ClusterSnapshot(kube_client, logger)
+        self.prober = prober or IngressProber(logger)
+        self.sink = sink or FindingSink()
+        # ingress (host, path) to probe mapped to the services/ingresses behind it
+        self.probe_targets = {}
 
-        self.logger.debug("Fetching %s namespace ingress data.", self.namespace)
-        try:
-            self.ingress = self.network.list_namespaced_ingress(
-                self.namespace, timeout_seconds=10
+    def ingress_probe_status(self, svc_name, ing_name, uri, response):
+        """[Log probe status of a service mapped with ingress]
+
+        Args:
+            svc_name ([str]): [Service name]
+            ing_name ([str]): [Ingress name]
+            uri ([str]): [URI probed]
+            response ([requests.Response]): [URL response, None if request failed,
+                IngressProber.NOT_PROBED if it was not probed within the deadline]
+
+        Returns:
+            [Finding]: [Probe status of the service]
+        """
+        if response is IngressProber.NOT_PROBED:
+            self.logger.info(
+                "Service %s/%s mapped with ingress %s was not probed within the %ss "
+                "deadline. URI: %s.",
+                self.namespace,
+                svc_name,
+                ing_name,
+                self.prober.deadline,
+                uri,
             )
-        except ApiException as exp:
-            self.logger.warning(
-                "Exception when calling NetworkingV1Api->list_namespaced_ingress: %s",
-                exp,
+            return self.sink.report(
+                self.namespace,
+                "Service",
+                svc_name,
+                "ingress_wrench",
+                "INGRESS_NOT_PROBED",
+                "info",
+                "Ingress %s URI: %s. Not probed within the %ss deadline."
+                % (ing_name, uri, self.prober.deadline),
             )
+        status_code = response.status_code if response is not None else None
+        if response is None:
+            status, severity, message = (
+                "INGRESS_NOT_REACHABLE",
+                "warning",
+                "Service %s/%s mapped with ingress %s is not reachable. URI: %s.",
+            )
+        elif status_code == 200:
+            status, severity, message = (
+                "INGRESS_WORKING",
+                "info",
+                "Service %s/%s mapped with ingress %s is working. "
+                "URI: %s. Response code: %s. ",
+            )
+        elif status_code in [302, 401]:
+            status, severity, message = (
+                "INGRESS_RESPONDING",
+                "info",
+                "Service %s/%s mapped with ingress %s seems to responding. "
+                "URI: %s. Response code: %s. ",
+            )
+        elif status_code in [400, 404, 500, 501, 502, 503, 504]:
+            status, severity, message = (
+                "INGRESS_NOT_WORKING",
+                "warning",
+                "Service %s/%s mapped with ingress %s is not working. "
+                "URI: %s. Response code: %s. ",
+            )
+        else:
+            status, severity, message = (
+                "INGRESS_NEEDS_CHECK",
+                "warning",
+                "Service %s/%s mapped with ingress %s needs to checked. "
+                "URI: %s. Response code: %s. ",
+            )
+        log_args = [self.namespace, svc_name, ing_name, uri]
+        if response is not None:
+            log_args.append(status_code)
+        if severity == "info":
+            self.logger.info(message, *log_args)
+        else:
+            self.logger.warning(message, *log_args)
+        return self.sink.report(
+            self.namespace,
+            "Service",
+            svc_name,
+            "ingress_wrench",
+            status,
+            severity,
+            "Ingress %s URI: %s. Response code: %s." % (ing_name, uri, status_code),
+        )
 
-    def test_ingress_url(self, uri):
-        """[Test ingress url]
-
-        Args:
-            protocol ([str]): [Protocol]
-            host ([str]): [Host]
-            path ([str]): [Path]
+    def ingress_probe(self):
+        """[Probe all ingress urls found by ingress_wrench and log their status]
 
         Returns:
-            response ([dict]): [URL response]
+            [list]: [Probe status findings of the services]
         """
-        try:
-            response = requests.get(uri, timeout=5, allow_redirects=False)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as exp:
-            self.logger.warning("Exception when calling requests.get: %s", exp)
-            response = 401
-        except requests.exceptions.HTTPError as err:
-            self.logger.warning("Http Error: %s", err)
-            response = ""
-        except requests.exceptions.ConnectionError as err:
-            self.logger.warning("%s", err)
-            response = ""
-        except requests.exceptions.Timeout as err:
-            self.logger.warning("%s", err)
-            response = ""
-        return response
+        if not self.probe_targets:
+            return []
+        if self.snapshot.offline:
+            self.logger.info(
+                "Skipping probe of %s ingress urls in namespace %s in offline mode.",
+                len(self.probe_targets),
+                self.namespace,
+            )
+            self.probe_targets = {}
+            return []
+        self.logger.info(
+            "Probing %s ingress urls in namespace %s.",
+            len(self.probe_targets),
+            self.namespace,
+        )
+        results = self.prober.probe(list(self.probe_targets), self.logger)
+        probe_findings = []
+        for target, (uri, response) in results.items():
+            for svc_name, ing_name in self.probe_targets[target]:
+                probe_findings.append(
+                    self.ingress_probe_status(svc_name, ing_name, uri, response)
+                )
+        self.probe_targets = {}
+        return probe_findings
 
     def ingress_wrench(self, svc):
-        """[Analyze ingress status]
+        """[Analyze ingress status, urls are probed later by ingress_probe]
 
         Args:
             svc ([dict]): [Service details]
@@ -68,7 +150,7 @@ class IngressWrench:
             self.namespace,
             svc.metadata.name,
         )
-        for ing in self.ingress.items:
+        for ing in self.snapshot.ingresses(self.namespace).items:
             try:
                 for rule in ing.spec.rules:
                     for path in rule.http.paths:
@@ -84,61 +166,11 @@ class IngressWrench:
                                 path.path,
                                 path.path_type,
                             )
-                            host = rule.host
-                            host_path = path.path
-
-                            if ing_mapped_to_svc:
-                                uri = "https://" + host + host_path
-                                response = self.test_ingress_url(uri)
-                                if not response:
-                                    self.logger.info(
-                                        "Request to https URL failed. Tyring http URL."
-                                    )
-                                    uri = "http://" + host + host_path
-                                    response = self.test_ingress_url(uri)
-
-                                status_code = response.status_code
-
-                                if status_code == 200:
-                                    self.logger.info(
-                                        "Service %s/%s mapped with ingress %s is working. "
-                                        "URI: %s. Response code: %s. ",
-                                        self.namespace,
-                                        svc.metadata.name,
-                                        ing_mapped_to_svc,
-                                        uri,
-                                        status_code
-                                    )
-                                elif status_code in [302, 401]:
-                                    self.logger.info(
-                                        "Service %s/%s mapped with ingress %s seems to responding. "
-                                        "URI: %s. Response code: %s. ",
-                                        self.namespace,
-                                        svc.metadata.name,
-                                        ing_mapped_to_svc,
-                                        uri,
-                                        status_code
-                                    )
-                                elif status_code in [400, 404, 500, 501, 502, 503, 504]:
-                                    self.logger.warning(
-                                        "Service %s/%s mapped with ingress %s is not working. "
-                                        "URI: %s. Response code: %s. ",
-                                        self.namespace,
-                                        svc.metadata.name,
-                                        ing_mapped_to_svc,
-                                        uri,
-                                        status_code
-                                    )
-                                else:
-                                    self.logger.warning(
-                                        "Service %s/%s mapped with ingress %s needs to checked. "
-                                        "URI: %s. Response code: %s. ",
-                                        self.namespace,
-                                        svc.metadata.name,
-                                        ing_mapped_to_svc,
-                                        uri,
-                                        status_code
-                                    )
+                            if rule.host:
+                                target = (rule.host, path.path or "/")
+                                mapped = self.probe_targets.setdefault(target, [])
+                                if (svc.metadata.name, ing_mapped_to_svc) not in mapped:
+                                    mapped.append((svc.metadata.name, ing_mapped_to_svc))
                             break
             except AttributeError:
                 self.logger.debug("No rules found in ingress %s.", ing.metadata.name)
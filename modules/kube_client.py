@@ -0,0 +1,145 @@
+"""[Module to share one pooled api client across wrench classes]"""
+import json
+import socket
+import kubernetes.client
+from kubernetes.client.rest import ApiException
+from urllib3.connection import HTTPConnection
+
+
+class KubeClient:
+    """
+    Client session created once per run and shared by every wrench class
+    """
+
+    # asks the api server for object metadata only, falls back to full objects
+    METADATA_ACCEPT = (
+        "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,"
+        "application/json"
+    )
+
+    def __init__(
+        self,
+        k8s_config,
+        logger,
+        pool_size=10,
+        keepalive=60,
+        page_size=500,
+        offline=False,
+    ):
+        self.k8s_config = k8s_config or kubernetes.client.Configuration()
+        self.logger = logger
+        self.page_size = page_size
+        # maxsize of the urllib3 pool is the number of connections kept warm per host
+        self.k8s_config.connection_pool_maxsize = pool_size
+        self.api_client = kubernetes.client.ApiClient(self.k8s_config)
+        if offline:
+            # resources come from a saved snapshot, calls fail like a missing resource
+            self.api_client.call_api = self.offline_call
+        self.set_keepalive(keepalive)
+        self.core = kubernetes.client.CoreV1Api(self.api_client)
+        self.network = kubernetes.client.NetworkingV1Api(self.api_client)
+        self.storage = kubernetes.client.StorageV1Api(self.api_client)
+        self.logger.debug(
+            "Created api client with connection pool size %s and keepalive %ss.",
+            pool_size,
+            keepalive,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def set_keepalive(self, keepalive):
+        """[Enable TCP keepalive on pooled connections]
+
+        Args:
+            keepalive ([int]): [Idle seconds before keepalive probes, 0 disables]
+        """
+        if not keepalive:
+            return
+        socket_options = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            socket_options += [
+                (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepalive),
+                (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(keepalive // 3, 1)),
+            ]
+        pool_manager = self.api_client.rest_client.pool_manager
+        pool_manager.connection_pool_kw["socket_options"] = socket_options
+
+    @staticmethod
+    def offline_call(resource_path, method, *args, **kwargs):
+        """[Reject api calls when running from a saved snapshot]
+
+        Args:
+            resource_path ([str]): [Path of the api call]
+            method ([str]): [HTTP method of the api call]
+
+        Raises:
+            ApiException: [Always, resource is not in the snapshot]
+        """
+        raise ApiException(
+            status=0,
+            reason="%s %s is not available in the snapshot" % (method, resource_path),
+        )
+
+    def list_paged(self, list_func, *args, list_meta=None, **kwargs):
+        """[Page through a list call with limit/continue, yielding items as they arrive]
+
+        Args:
+            list_func ([function]): [List function of the API]
+            list_meta ([dict]): [Filled with resource_version of the list if passed]
+
+        Yields:
+            [object]: [Items of each page]
+        """
+        _continue = None
+        while True:
+            page = list_func(
+                *args, limit=self.page_size, _continue=_continue, **kwargs
+            )
+            if list_meta is not None:
+                list_meta["resource_version"] = page.metadata.resource_version
+            yield from page.items
+            _continue = page.metadata._continue
+            if not _continue:
+                break
+
+    def list_names(self, resource_path, namespace):
+        """[List names of a namespaced kind without fetching the objects]
+
+        Args:
+            resource_path ([str]): [List path, e.g. /api/v1/namespaces/{namespace}/secrets]
+            namespace ([str]): [Namespace name]
+
+        Returns:
+            [set]: [Object names]
+        """
+        names, _continue = set(), None
+        while True:
+            query_params = [("limit", self.page_size), ("timeoutSeconds", 10)]
+            if _continue:
+                query_params.append(("continue", _continue))
+            response = self.api_client.call_api(
+                resource_path,
+                "GET",
+                path_params={"namespace": namespace},
+                query_params=query_params,
+                header_params={"Accept": self.METADATA_ACCEPT},
+                auth_settings=["BearerToken"],
+                _return_http_data_only=True,
+                _preload_content=False,
+            )
+            page = json.loads(response.data)
+            names.update(item["metadata"]["name"] for item in page.get("items") or [])
+            _continue = page.get("metadata", {}).get("continue")
+            if not _continue:
+                return names
+
+    def close(self):
+        """[Release pooled connections of the api client]"""
+        self.api_client.rest_client.pool_manager.clear()
+        self.api_client.close()
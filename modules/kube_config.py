@@ -1,8 +1,35 @@
+import os
 from kubernetes import config, client
 
 
 class KubeConfig:
-    def load_kube_config(output, logger):
+    def load_kube_config(output, logger, config_file=None, context=None):
+        """[Load the api client configuration of a cluster]
+
+        Args:
+            output ([str]): [Output format]
+            logger ([logging.Logger]): [Logger]
+            config_file ([str]): [Kubeconfig file, None for KUBECONFIG from env]
+            context ([str]): [Context name, None for the current context]
+
+        Returns:
+            [Configuration]: [Api client configuration of the cluster]
+        """
+        if config_file or context:
+            # each cluster gets its own configuration, the default one is not changed
+            logger.info(
+                "Using kubeconfig %s context %s.",
+                config_file or "from env",
+                context or "current",
+            )
+            configuration = client.Configuration()
+            config.load_kube_config(
+                config_file=config_file,
+                context=context,
+                client_configuration=configuration,
+            )
+            configuration.verify_ssl = False
+            return configuration
         try:
             logger.info("Using kubeconfig from env.")
             config.load_kube_config()
@@ -12,3 +39,60 @@ class KubeConfig:
         except:
             logger.info("Using in-cluster kubeconfig.")
             config.load_incluster_config()
+            return client.Configuration().get_default_copy()
+
+    def clusters(config_files, contexts):
+        """[Clusters to diagnose from kubeconfig files and context names]
+
+        Args:
+            config_files ([list]): [Kubeconfig files, None for KUBECONFIG from env]
+            contexts ([list]): [Context names, None for the current context of each file]
+
+        Returns:
+            [list]: [(cluster name, kubeconfig file, context name)]
+        """
+        if not config_files and not contexts:
+            return [("default", None, None)]
+        clusters = []
+        for config_file in config_files or [None]:
+            names = contexts
+            if not names:
+                try:
+                    _, current = config.list_kube_config_contexts(
+                        config_file=config_file
+                    )
+                    names = [current["name"]]
+                except Exception:
+                    # the file fails again when its cluster is diagnosed and is
+                    # reported as a failed cluster, the other files still run
+                    names = [None]
+            for context in names:
+                if (config_file, context) not in [cluster[1:] for cluster in clusters]:
+                    clusters.append((context, config_file, context))
+        # the same context in several files is told apart by the file name, or by
+        # the path when the file names are the same too
+        named = []
+        for _, config_file, context in clusters:
+            candidates = [context or config_file or "default"]
+            if config_file:
+                candidates.append("%s:%s" % (os.path.basename(config_file), context))
+                candidates.append("%s:%s" % (config_file, context))
+            named.append(candidates)
+        names = []
+        for candidates in named:
+            name = next(
+                (
+                    candidate
+                    for candidate in candidates
+                    if sum(candidate in other for other in named) == 1
+                ),
+                candidates[-1],
+            )
+            # e.g. a relative and an absolute path of the same file
+            while name in names:
+                name += "#%s" % len(names)
+            names.append(name)
+        return [
+            (name, config_file, context)
+            for name, (_, config_file, context) in zip(names, clusters)
+        ]
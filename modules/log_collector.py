@@ -0,0 +1,102 @@
+"""[Module to fetch container logs concurrently]"""
+from concurrent.futures import ThreadPoolExecutor
+from kubernetes.client.rest import ApiException
+from urllib3.exceptions import HTTPError
+from .log_scanner import LogScanner
+
+
+class LogCollector:
+    """
+    Fetch container logs over the shared api client with a bounded worker pool and
+    scan them for failure signatures as they are streamed
+    """
+
+    def __init__(
+        self,
+        kube_client,
+        workers=10,
+        limit_bytes=262144,
+        tail_lines=1000,
+        timeout=30,
+        show_lines=10,
+        chunk_size=16384,
+    ):
+        self.core = kube_client.core
+        self.limit_bytes = limit_bytes
+        self.tail_lines = tail_lines
+        self.timeout = timeout
+        self.show_lines = show_lines
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def close(self):
+        """[Stop log workers]"""
+        self.executor.shutdown(wait=False)
+
+    def fetch(self, target, logger):
+        """[Stream logs of a container through the signature scanner]
+
+        Args:
+            target ([tuple]): [Namespace, pod name, container name and previous flag]
+            logger ([logging.Logger]): [Logger of the namespace being checked]
+
+        Returns:
+            [LogScan]: [Signature matches and last lines, None if logs could not be read]
+        """
+        namespace, pod_name, container_name, previous = target
+        logger.debug(
+            "Fetching %slogs for pod %s/%s container %s.",
+            "previous " if previous else "",
+            namespace,
+            pod_name,
+            container_name,
+        )
+        try:
+            response = self.core.read_namespaced_pod_log(
+                pod_name,
+                namespace,
+                container=container_name,
+                previous=previous,
+                follow=False,
+                tail_lines=self.tail_lines,
+                limit_bytes=self.limit_bytes,
+                _request_timeout=self.timeout,
+                _preload_content=False,
+            )
+            try:
+                return LogScanner.scan(
+                    response.stream(self.chunk_size, decode_content=True),
+                    self.show_lines,
+                )
+            finally:
+                response.release_conn()
+        except ApiException as exp:
+            reason = exp.reason
+        except HTTPError as exp:
+            # timeouts and dropped connections, while requesting or streaming
+            reason = exp
+        logger.debug(
+            "Could not read %slogs for %s/%s container %s: %s",
+            "previous " if previous else "",
+            namespace,
+            pod_name,
+            container_name,
+            reason,
+        )
+        return None
+
+    def collect(self, targets, logger):
+        """[Fetch logs of all targets concurrently]
+
+        Args:
+            targets ([list]): [(namespace, pod name, container name, previous)]
+            logger ([logging.Logger]): [Logger of the namespace being checked]
+
+        Returns:
+            [dict]: [Target to its LogScan, None if logs could not be read]
+        """
+        futures = {
+            target: self.executor.submit(self.fetch, target, logger)
+            for target in targets
+        }
+        return {target: future.result() for target, future in futures.items()}
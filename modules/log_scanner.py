@@ -0,0 +1,188 @@
+"""[Module to classify container logs by known failure signatures]"""
+import codecs
+import collections
+import re
+
+
+class LogScan:
+    """
+    Signature matches of one container log, built chunk by chunk
+    """
+
+    __slots__ = ("counts", "samples", "lines", "tail", "carry", "decoder")
+
+    def __init__(self, tail_lines=10):
+        self.counts = {}
+        self.samples = {}
+        self.lines = 0
+        # last lines are kept for display, the whole log is never buffered
+        self.tail = collections.deque(maxlen=tail_lines)
+        self.carry = ""
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def root_cause(self):
+        """[Most specific signature found in the log]
+
+        Returns:
+            [tuple]: [Signature name, hint and sample line, None if nothing matched]
+        """
+        for name, _, hint in LogScanner.SIGNATURES:
+            if name in self.counts:
+                return name, hint, self.samples[name]
+        return None
+
+    def merge(self, other):
+        """[Add matches of another scan of the same container, e.g. previous run]
+
+        Args:
+            other ([LogScan]): [Scan to add]
+
+        Returns:
+            [LogScan]: [This scan]
+        """
+        for name, count in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + count
+            self.samples.setdefault(name, other.samples[name])
+        self.lines += other.lines
+        return self
+
+
+class LogScanner:
+    """
+    Match all failure signatures in one pass with a single compiled pattern
+    """
+
+    # most specific causes first, root_cause picks the first one found. Every
+    # alternative starts with a literal so the combined pattern skips ahead in C
+    # to the next possible first character instead of trying each position
+    SIGNATURES = [
+        (
+            "oom",
+            r"OutOfMemoryError|Out of memory|out of memory|Cannot allocate memory"
+            r"|MemoryError|OOMKilled",
+            "Process ran out of memory. Check memory limits and usage of the container.",
+        ),
+        (
+            "missing_env",
+            r"environment variable[^\n]{0,80}?\b(?:not set|not defined|missing|required)"
+            r"|Environment variable[^\n]{0,80}?\b(?:not set|not defined|missing|required)"
+            r"|env var[^\n]{0,80}?\b(?:not set|not defined|missing|required)"
+            r"|KeyError: '[A-Z][A-Z0-9_]+'|missing required env",
+            "An environment variable the application needs is not set. Check env and "
+            "envFrom of the container.",
+        ),
+        (
+            "permission_denied",
+            r"Permission denied|permission denied|EACCES|Operation not permitted"
+            r"|AccessDeniedException|is forbidden: User",
+            "Access was denied. Check securityContext, volume permissions and RBAC.",
+        ),
+        (
+            "dns_failure",
+            r"no such host|Name or service not known|Temporary failure in name resolution"
+            r"|UnknownHostException|getaddrinfo (?:ENOTFOUND|EAI_AGAIN)"
+            r"|Could not resolve host|could not resolve host|NXDOMAIN",
+            "A hostname could not be resolved. Check service names and cluster DNS.",
+        ),
+        (
+            "connection_refused",
+            r"Connection refused|connection refused|ECONNREFUSED",
+            "A dependency refused the connection. Check that the target service is up "
+            "and its port is correct.",
+        ),
+        (
+            "python_traceback",
+            r"Traceback \(most recent call last\):",
+            "Python application raised an unhandled exception.",
+        ),
+        (
+            "go_panic",
+            r"panic: |goroutine \d+ \[running\]:|fatal error: ",
+            "Go application panicked.",
+        ),
+        (
+            "java_stack_trace",
+            r"Exception in thread \"|\tat [\w$.<>]+\([\w$]+\.java:\d+\)"
+            r"|Caused by: [\w.$]+(?:Exception|Error)",
+            "Java application threw an unhandled exception.",
+        ),
+    ]
+
+    # one flat alternation of all signatures, a match is classified afterwards
+    PATTERN = re.compile("|".join(pattern for _, pattern, _ in SIGNATURES))
+
+    MATCHERS = [(name, re.compile(pattern)) for name, pattern, _ in SIGNATURES]
+
+    @staticmethod
+    def classify(text):
+        """[Signature of a matched text]
+
+        Args:
+            text ([str]): [Text matched by the combined pattern]
+
+        Returns:
+            [str]: [Signature name]
+        """
+        for name, matcher in LogScanner.MATCHERS:
+            if matcher.fullmatch(text):
+                return name
+        return LogScanner.MATCHERS[-1][0]
+
+    @staticmethod
+    def scan_text(scan, text):
+        """[Match signatures in complete lines of a log]
+
+        Args:
+            scan ([LogScan]): [Scan to update]
+            text ([str]): [Complete log lines]
+        """
+        for match in LogScanner.PATTERN.finditer(text):
+            name = LogScanner.classify(match.group())
+            scan.counts[name] = scan.counts.get(name, 0) + 1
+            if name not in scan.samples:
+                line_start = text.rfind("\n", 0, match.start()) + 1
+                line_end = text.find("\n", match.end())
+                scan.samples[name] = text[
+                    line_start : line_end if line_end >= 0 else len(text)
+                ].strip()[:300]
+        scan.lines += text.count("\n") + (not text.endswith("\n"))
+        if scan.tail.maxlen:
+            scan.tail.extend(
+                text.rstrip("\n").rsplit("\n", scan.tail.maxlen)[-scan.tail.maxlen :]
+            )
+
+    @staticmethod
+    def feed(scan, chunk):
+        """[Scan a chunk of a log stream, lines split across chunks are carried over]
+
+        Args:
+            scan ([LogScan]): [Scan to update]
+            chunk ([bytes]): [Log chunk]
+        """
+        text = scan.carry + scan.decoder.decode(chunk)
+        last_newline = text.rfind("\n")
+        if last_newline < 0:
+            scan.carry = text
+            return
+        scan.carry = text[last_newline + 1 :]
+        LogScanner.scan_text(scan, text[: last_newline + 1])
+
+    @staticmethod
+    def scan(chunks, tail_lines=10):
+        """[Scan a log stream]
+
+        Args:
+            chunks ([iterable]): [Log chunks as bytes]
+            tail_lines ([int]): [Last lines kept for display]
+
+        Returns:
+            [LogScan]: [Signature matches of the log]
+        """
+        scan = LogScan(tail_lines)
+        for chunk in chunks:
+            LogScanner.feed(scan, chunk)
+        rest = scan.carry + scan.decoder.decode(b"", final=True)
+        scan.carry = ""
+        if rest:
+            LogScanner.scan_text(scan, rest)
+        return scan
@@ -1,4 +1,4 @@
-import logging, colorlog, os, sys
+import logging, logging.handlers, colorlog, os, sys
 
 
 class Logger(logging.Formatter):
@@ -6,12 +6,12 @@ class Logger(logging.Formatter):
         logger = logging.getLogger()
 
         if "debug" in loglevel:
-            if format == "json":
+            if format in ["json", "ndjson"]:
                 formatter = '{"time": "%(asctime)s", "origin": "p%(process)s %(filename)s:%(name)s:%(lineno)d", "level": "%(levelname)s", "log": "%(message)s"}'
             else:
                 formatter = "[%(levelname)s] %(asctime)s p%(process)s %(filename)s:%(name)s:%(lineno)d %(message)s"
         else:
-            if format == "json":
+            if format in ["json", "ndjson"]:
                 formatter = '{"time": "%(asctime)s", "level": "%(levelname)s", "log": "%(message)s"}'
             else:
                 formatter = "[%(levelname)s] %(message)s"
@@ -36,9 +36,40 @@ class Logger(logging.Formatter):
                     "CRITICAL": "bold_red",
                 },
             )
+        else:
+            f = logging.Formatter(formatter)
         console_handler = logging.StreamHandler()
 
         console_handler.setFormatter(f)
         logger.addHandler(console_handler)
 
         return logger
+
+    def buffered_logger(name):
+        """[Logger which holds its records until flushed to the root logger]
+
+        Args:
+            name ([str]): [Logger name suffix, e.g. namespace being processed]
+
+        Returns:
+            [logging.Logger]: [Buffered logger]
+        """
+        logger = logging.getLogger("kube-wrench." + name)
+        logger.propagate = False
+        logger.handlers = [logging.handlers.BufferingHandler(capacity=sys.maxsize)]
+        return logger
+
+    def flush_buffered(logger, target=None):
+        """[Write buffered records to the root logger handlers in logged order]
+
+        Args:
+            logger ([logging.Logger]): [Buffered logger]
+            target ([logging.Logger]): [Logger to write to, e.g. the buffered logger
+                of a cluster. Default is the root logger.]
+        """
+        target = target or logging.getLogger()
+        for handler in logger.handlers:
+            for record in handler.buffer:
+                target.handle(record)
+            handler.close()
+        logger.handlers = []
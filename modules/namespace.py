@@ -1,6 +1,7 @@
 """[Module to namespace details]"""
-import kubernetes.client
 from kubernetes.client.rest import ApiException
+from .snapshot import ClusterSnapshot
+from .findings import FindingSink
 
 
 class NameSpaceWrench:
@@ -8,11 +9,12 @@ class NameSpaceWrench:
     Class to check namespace details in cluster
     """
 
-    def __init__(self, k8s_config, logger):
-        self.k8s_config = k8s_config
+    def __init__(self, kube_client, logger, snapshot=None, sink=None):
+        self.kube_client = kube_client
         self.logger = logger
-        with kubernetes.client.ApiClient(k8s_config) as api_client:
-            self.core = kubernetes.client.CoreV1Api(api_client)
+        self.snapshot = snapshot or ClusterSnapshot(kube_client, logger)
+        self.sink = sink or FindingSink()
+        self.core = kube_client.core
 
     def get_ns_list(self):
         """[Get namespace list]
@@ -30,27 +32,23 @@ class NameSpaceWrench:
             )
             return None
 
-    def get_ns_events(self, namespace, pod_name):
-        """[Get namespace events]
+    def get_ns_events(self, namespace, pod):
+        """[Get namespace events of a pod]
 
         Args:
             namespace ([str]): [Namespace name]
+            pod ([dict]): [Pod object]
 
         Returns:
-            [list]: [list of namespace events]
+            [list]: [Findings of pod warning events, newest first]
         """
-        self.logger.debug("Fetching namespace events in the cluster.")
-        try:
-            ns_events = self.core.list_namespaced_event(namespace, timeout_seconds=10)
-        except ApiException as exp:
-            self.logger.warning(
-                "Exception when calling CoreV1Api->list_namespaced_event: %s", exp
-            )
-            return None
-
-        if ns_events.items:
-            for event in ns_events.items:
-                if not "Normal" in event.type and event.involved_object.name in pod_name:
+        pod_events = self.snapshot.object_events(
+            "Pod", namespace, pod.metadata.name, pod.metadata.uid
+        )
+        event_findings = []
+        if pod_events:
+            for event in pod_events:
+                if event.type and "Normal" not in event.type:
                     self.logger.warning(
                         "Event related: %s %s %s/%s. Message: %s. Node: %s",
                         event.reason,
@@ -60,6 +58,17 @@ class NameSpaceWrench:
                         event.message,
                         event.reporting_instance,
                     )
+                    event_findings.append(
+                        self.sink.report(
+                            namespace,
+                            "Pod",
+                            pod.metadata.name,
+                            "get_ns_events",
+                            event.reason,
+                            "warning",
+                            event.message,
+                        )
+                    )
                 else:
                     self.logger.debug(
                         "Event: %s %s %s/%s. Message: %s. Node: %s",
@@ -72,9 +81,9 @@ class NameSpaceWrench:
                     )
         else:
             self.logger.info(
-                "No events found in %s namespace for the cluster.", namespace
+                "No events found for pod %s/%s.", namespace, pod.metadata.name
             )
-        return ns_events
+        return event_findings
 
     def namespace_wrench(self):
         """[Process namespace details and events]
@@ -1,5 +1,6 @@
 """[Output module for kube-wrench]
 """
+import sys
 import time
 
 class Output:
@@ -15,50 +16,12 @@ class Output:
     FALSE = RED + "False" + RESET
     TRUE = GREEN + "True" + RESET
 
-    def time_taken(start_time):
+    def time_taken(start_time, stream=sys.stdout):
         """[Calculate time taken]"""
         print(
             Output.GREEN
             + "\nTotal time taken: "
             + Output.RESET
-            + "{}s".format(round((time.time() - start_time), 2))
+            + "{}s".format(round((time.time() - start_time), 2)),
+            file=stream,
         )
-
-
-    def convert_cpu(cpu_val):
-        """[Convert to cpu cores]
-
-        Args:
-            cpu_val ([str/int]): [Cpu value]
-
-        Returns:
-            [int]: [Cpu cores]
-        """
-        cpu_str = str(cpu_val)
-        if cpu_str == "":
-            cpu = 0
-        elif "m" in cpu_str:
-            cpu = int(cpu_str.replace("m", "")) / 1000
-        else:
-            cpu = int(cpu_str)
-        return cpu
-
-    def convert_memory(memory_val):
-        """[Convert to memory in GB]
-
-        Args:
-            memory_val ([str/int]): [Memory value]
-
-        Returns:
-            [int]: [Memory in GB]
-        """
-        memory_str = str(memory_val)
-        if memory_str == "":
-            memory = 0
-        elif "Mi" in memory_str:
-            memory = int(memory_str.replace("Mi", "")) / 1000
-        elif "Ki" in memory_str:
-            memory = int(memory_str.replace("Ki", "")) / 1000000
-        else:
-            memory = int(memory_str.replace("Gi", ""))
-        return memory
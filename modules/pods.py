@@ -1,41 +1,165 @@
 """[Module to process pods]"""
-import kubernetes.client
 from kubernetes.client.rest import ApiException
 from .containers import ContainerWrench
 from .service import ServiceWrench
 from .namespace import NameSpaceWrench
+from .snapshot import ClusterSnapshot
+from .findings import FindingSink
+
 
 class PodWrench:
     """
     Check pod status and log details
     """
 
-    def __init__(self, k8s_config, namespace, logger):
-        self.k8s_config = k8s_config
+    def __init__(
+        self,
+        kube_client,
+        namespace,
+        logger,
+        snapshot=None,
+        prober=None,
+        sink=None,
+        collector=None,
+    ):
+        self.kube_client = kube_client
         self.namespace = namespace
         self.logger = logger
-        with kubernetes.client.ApiClient(k8s_config) as api_client:
-            self.core = kubernetes.client.CoreV1Api(api_client)
+        self.snapshot = snapshot or ClusterSnapshot(kube_client, logger)
+        self.prober = prober
+        self.sink = sink or FindingSink()
+        self.core = kube_client.core
+        self.container = ContainerWrench(
+            kube_client, namespace, logger, self.snapshot, self.sink, collector
+        )
+        self.ns_events = NameSpaceWrench(kube_client, logger, self.snapshot, self.sink)
 
     def get_pods(self):
-        """[Get all pods in the namespace]
+        """[Get all pods in the namespace, page by page]
 
-        Returns:
-            [list]: [List of pods]
+        Yields:
+            [dict]: [Pod object]
         """
+        pods = self.snapshot.pods(self.namespace)
+        if pods is not None:
+            self.logger.debug("Using snapshot pod data for namespace %s", self.namespace)
+            yield from pods.items
+            return
         try:
             self.logger.info("Fetching %s namespace pods data.", self.namespace)
-            pods = self.core.list_namespaced_pod(self.namespace, timeout_seconds=10)
+            yield from self.kube_client.list_paged(
+                self.core.list_namespaced_pod, self.namespace, timeout_seconds=10
+            )
             self.logger.debug("Fetched pod data for namespace %s", self.namespace)
-            # self.logger.debug("Pod details: %s", pods)
-            return pods
         except ApiException as exp:
             self.logger.warning(
                 "Exception when calling CoreV1Api->list_pod_for_namespace %s: %s",
                 self.namespace,
                 exp,
             )
-            return None
+
+    def pvc_storage_status(self, pvc, pod_name):
+        """[Check the PersistentVolume and StorageClass a PVC is bound or provisioned by]
+
+        Args:
+            pvc ([dict]): [PVC object]
+            pod_name ([str]): [Name of the pod using the PVC]
+
+        Returns:
+            [list]: [Storage findings of the PVC]
+        """
+        findings = []
+        claim_name = pvc.metadata.name
+        volume_name = pvc.spec.volume_name
+        class_name = pvc.spec.storage_class_name
+        if volume_name:
+            volumes = self.snapshot.persistent_volumes()
+            if volumes is None:
+                self.logger.warning(
+                    "Could not check PersistentVolume %s of PVC %s. Pod: %s/%s.",
+                    volume_name,
+                    claim_name,
+                    self.namespace,
+                    pod_name,
+                )
+                return findings
+            pv = volumes.get(volume_name)
+            if pv is None:
+                status, message = (
+                    "PV_NOT_FOUND",
+                    "PersistentVolume %s of PVC %s does not exist." % (volume_name, claim_name),
+                )
+            elif pv.status.phase not in ["Bound", "Available"]:
+                status, message = (
+                    "PV_" + str(pv.status.phase).upper(),
+                    "PersistentVolume %s of PVC %s is in %s state. Message: %s"
+                    % (volume_name, claim_name, pv.status.phase, pv.status.message),
+                )
+            else:
+                status = None
+            if status:
+                self.logger.warning("%s Pod: %s/%s.", message, self.namespace, pod_name)
+                findings.append(
+                    self.sink.report(
+                        self.namespace,
+                        "PersistentVolumeClaim",
+                        claim_name,
+                        "pvc_storage_status",
+                        status,
+                        "warning",
+                        message,
+                    )
+                )
+        elif class_name and pvc.status.phase != "Bound":
+            storage_classes = self.snapshot.storage_classes()
+            if storage_classes is None:
+                self.logger.warning(
+                    "Could not check StorageClass %s of PVC %s. Pod: %s/%s.",
+                    class_name,
+                    claim_name,
+                    self.namespace,
+                    pod_name,
+                )
+                return findings
+            storage_class = storage_classes.get(class_name)
+            if storage_class is None:
+                self.logger.warning(
+                    "StorageClass %s of PVC %s does not exist. Pod: %s/%s.",
+                    class_name,
+                    claim_name,
+                    self.namespace,
+                    pod_name,
+                )
+                findings.append(
+                    self.sink.report(
+                        self.namespace,
+                        "PersistentVolumeClaim",
+                        claim_name,
+                        "pvc_storage_status",
+                        "STORAGECLASS_NOT_FOUND",
+                        "warning",
+                        "StorageClass %s does not exist." % class_name,
+                    )
+                )
+            elif storage_class.volume_binding_mode == "WaitForFirstConsumer":
+                self.logger.info(
+                    "PVC %s waits for pod %s/%s to be scheduled before StorageClass %s "
+                    "provisions a volume.",
+                    claim_name,
+                    self.namespace,
+                    pod_name,
+                    class_name,
+                )
+            else:
+                self.logger.warning(
+                    "PVC %s is waiting for provisioner %s of StorageClass %s. Pod: %s/%s.",
+                    claim_name,
+                    storage_class.provisioner,
+                    class_name,
+                    self.namespace,
+                    pod_name,
+                )
+        return findings
 
     def pod_pvc_status(self, pod):
         """[Get PVC status for the pod]
@@ -44,13 +168,13 @@ class PodWrench:
             pod ([dict]): [Pod details in dict]
 
         Returns:
-            [list]: [PVC status for the pod]
+            [list]: [PVC status findings for the pod]
         """
         pod_pvc_chk_result = []
         if pod.spec.volumes:
+            pod_name = pod.metadata.name
             for volume in pod.spec.volumes:
                 if volume.persistent_volume_claim:
-                    pod_name = pod.metadata.name
                     claim_name = volume.persistent_volume_claim.claim_name
                     self.logger.info(
                         "Checking PVC %s status for pod: %s/%s ",
@@ -58,27 +182,64 @@ class PodWrench:
                         self.namespace,
                         pod_name,
                     )
-                    pvc_status = self.core.read_namespaced_persistent_volume_claim(
-                        claim_name, self.namespace
-                    )
-                    if pvc_status.status.phase == "Bound":
+                    # PVCs, PVs and StorageClasses are listed once for all pod checks
+                    pvc_index = self.snapshot.pvc_index(self.namespace)
+                    if pvc_index is None:
+                        self.logger.warning(
+                            "Could not check PVC %s of pod %s/%s.",
+                            claim_name,
+                            self.namespace,
+                            pod_name,
+                        )
+                        continue
+                    pvc = pvc_index.get(claim_name)
+                    if pvc is None:
+                        self.logger.warning(
+                            "PVC %s of pod %s/%s does not exist.",
+                            claim_name,
+                            self.namespace,
+                            pod_name,
+                        )
+                        pod_pvc_chk_result.append(
+                            self.sink.report(
+                                self.namespace,
+                                "PersistentVolumeClaim",
+                                claim_name,
+                                "pod_pvc_status",
+                                "PVC_NOT_FOUND",
+                                "warning",
+                                "PVC %s of pod %s does not exist." % (claim_name, pod_name),
+                            )
+                        )
+                        continue
+                    if pvc.status.phase == "Bound":
                         self.logger.info(
                             "PVC %s is in Bound state for pod: %s/%s.",
-                            self.namespace,
-                            pod.metadata.name,
                             claim_name,
+                            self.namespace,
+                            pod_name,
                         )
                     else:
                         self.logger.warning(
                             "PVC %s is in %s state for pod: %s/%s.",
-                            self.namespace,
-                            pvc_status.status.phase,
-                            pod.metadata.name,
                             claim_name,
+                            pvc.status.phase,
+                            self.namespace,
+                            pod_name,
                         )
                     pod_pvc_chk_result.append(
-                        [pod_name, claim_name, pvc_status.status.phase]
+                        self.sink.report(
+                            self.namespace,
+                            "PersistentVolumeClaim",
+                            claim_name,
+                            "pod_pvc_status",
+                            "PVC_" + str(pvc.status.phase).upper(),
+                            "info" if pvc.status.phase == "Bound" else "warning",
+                            "PVC %s of pod %s is in %s state."
+                            % (claim_name, pod_name, pvc.status.phase),
+                        )
                     )
+                    pod_pvc_chk_result += self.pvc_storage_status(pvc, pod_name)
         else:
             self.logger.info(
                 "Pod %s/%s does not have any PVC.", self.namespace, pod.metadata.name
@@ -92,7 +253,7 @@ class PodWrench:
             pod ([dict]): [Pod details in dict]
 
         Returns:
-            [list]: [Node allocation status for the pod]
+            [list]: [Node allocation status findings for the pod]
         """
         pod_node_chk_result = []
         self.logger.info(
@@ -108,7 +269,15 @@ class PodWrench:
                 pod.spec.node_name,
             )
             pod_node_chk_result.append(
-                [pod.metadata.name, pod.spec.node_name, "NODE_ALLOCATED"]
+                self.sink.report(
+                    self.namespace,
+                    "Pod",
+                    pod.metadata.name,
+                    "pod_node_status",
+                    "NODE_ALLOCATED",
+                    "info",
+                    "Pod is scheduled on node %s." % pod.spec.node_name,
+                )
             )
         else:
             self.logger.warning(
@@ -116,7 +285,7 @@ class PodWrench:
                 self.namespace,
                 pod.metadata.name,
             )
-            for status in pod.status.conditions:
+            for status in pod.status.conditions or []:
                 self.logger.warning(
                     "Pod %s/%s is in %s state. Message: %s.",
                     self.namespace,
@@ -125,7 +294,15 @@ class PodWrench:
                     status.message,
                 )
             pod_node_chk_result.append(
-                [pod.metadata.name, pod.spec.node_name, "NODE_NOT_ALLOCATED"]
+                self.sink.report(
+                    self.namespace,
+                    "Pod",
+                    pod.metadata.name,
+                    "pod_node_status",
+                    "NODE_NOT_ALLOCATED",
+                    "warning",
+                    "Pod is not scheduled on any node.",
+                )
             )
         return pod_node_chk_result
 
@@ -136,11 +313,9 @@ class PodWrench:
             pod ([dict]): [Pod object]
 
         Returns:
-            [list]: [Pod status]
+            [Finding]: [Pod status]
         """
         pod_status = pod.status.phase
-        container = ContainerWrench(self.k8s_config, self.namespace, self.logger)
-        ns_events = NameSpaceWrench(self.k8s_config, self.logger)
         if pod_status == "Running":
             self.logger.info(
                 "Pod %s/%s is in %s phase.",
@@ -148,7 +323,7 @@ class PodWrench:
                 pod.metadata.name,
                 pod_status,
             )
-            container.container_wrench(pod)
+            self.container.container_wrench(pod)
             svc.service_wrench(pod)
         elif pod_status in ["Pending", "Failed", "Unknown"]:
             self.logger.warning(
@@ -159,8 +334,8 @@ class PodWrench:
             )
             if PodWrench.pod_node_status(self, pod):
                 PodWrench.pod_pvc_status(self, pod)
-                ns_events.get_ns_events(self.namespace, pod.metadata.name)
-                container.container_wrench(pod)
+                self.ns_events.get_ns_events(self.namespace, pod)
+                self.container.container_wrench(pod)
         elif pod_status == "Succeeded":
             self.logger.info(
                 "Pod %s/%s is in Completed phase.", self.namespace, pod.metadata.name
@@ -170,16 +345,36 @@ class PodWrench:
                 "Pod %s/%s status is Invalid.", self.namespace, pod.metadata.name
             )
             pod_status = "Invalid"
-        pod_status_chk = [pod.metadata.name, pod_status]
+        pod_status_chk = self.sink.report(
+            self.namespace,
+            "Pod",
+            pod.metadata.name,
+            "check_pod_status",
+            "POD_" + pod_status.upper(),
+            {"Running": "info", "Succeeded": "info", "Invalid": "error"}.get(
+                pod_status, "warning"
+            ),
+            "Pod is in %s phase." % pod_status,
+        )
         return pod_status_chk
 
     def pod_wrench(self):
         """[Get status of all pods in a namespace]"""
         pods = PodWrench.get_pods(self)
-        svc = ServiceWrench(self.k8s_config, self.namespace, self.logger)
-        if pods:
-            for pod in pods.items:
-                self.logger.debug(
-                    "Checking status of pod: %s/%s ", self.namespace, pod.metadata.name
-                )
-                PodWrench.check_pod_status(self, pod, svc)
+        svc = ServiceWrench(
+            self.kube_client,
+            self.namespace,
+            self.logger,
+            self.snapshot,
+            self.prober,
+            self.sink,
+        )
+        for pod in pods:
+            self.logger.debug(
+                "Checking status of pod: %s/%s ", self.namespace, pod.metadata.name
+            )
+            PodWrench.check_pod_status(self, pod, svc)
+        # ingress urls and container logs of all pods are fetched concurrently
+        # once pods are checked
+        svc.ingress.ingress_probe()
+        self.container.container_logs()
@@ -0,0 +1,168 @@
+"""[Module to probe ingress urls concurrently]"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ProbeCache:
+    """
+    Memoize probe results by scheme, host and path for ttl seconds
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.results = {}
+        self.https_failed = {}
+        self.lock = threading.Lock()
+
+    def fresh(self, cached_at):
+        """[Check if an entry cached at the given time is still valid]"""
+        return time.monotonic() - cached_at < self.ttl
+
+    def get(self, uri):
+        """[Get cached probe result of a uri]
+
+        Args:
+            uri ([str]): [scheme+host+path]
+
+        Returns:
+            [tuple]: [True and cached response if found, else False and None]
+        """
+        with self.lock:
+            entry = self.results.get(uri)
+            if entry and self.fresh(entry[0]):
+                return True, entry[1]
+            return False, None
+
+    def set(self, uri, response):
+        """[Cache probe result of a uri, response is None for failed requests]"""
+        with self.lock:
+            self.results[uri] = (time.monotonic(), response)
+
+    def https_known_failed(self, host):
+        """[Check if https recently failed for the host]"""
+        with self.lock:
+            failed_at = self.https_failed.get(host)
+            return bool(failed_at) and self.fresh(failed_at)
+
+    def set_https_failed(self, host):
+        """[Remember that https failed for the host so http is tried directly]"""
+        with self.lock:
+            self.https_failed[host] = time.monotonic()
+
+
+class IngressProber:
+    """
+    Probe ingress urls concurrently over a pooled http session
+    """
+
+    # response of probes which did not run within the deadline, e.g. queued
+    # behind probes of other namespaces, nothing is known about their host
+    NOT_PROBED = object()
+
+    def __init__(
+        self, logger, workers=10, per_host=2, timeout=5, deadline=60, cache_ttl=300
+    ):
+        self.logger = logger
+        self.timeout = timeout
+        self.deadline = deadline
+        self.cache = ProbeCache(cache_ttl)
+        self.session = requests.Session()
+        # pool_block makes per_host a hard limit of connections to one host
+        adapter = HTTPAdapter(
+            pool_connections=workers, pool_maxsize=per_host, pool_block=True
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def close(self):
+        """[Stop probe workers and release pooled connections]"""
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def test_url(self, uri, logger):
+        """[Test ingress url]
+
+        Args:
+            uri ([str]): [URL to request]
+            logger ([logging.Logger]): [Logger of the namespace being probed]
+
+        Returns:
+            response ([requests.Response]): [URL response, None if request failed]
+        """
+        cached, response = self.cache.get(uri)
+        if cached:
+            logger.debug("Using cached probe result of %s.", uri)
+            return response
+        try:
+            response = self.session.get(
+                uri, timeout=self.timeout, allow_redirects=False
+            )
+        except requests.exceptions.RequestException as exp:
+            logger.debug("Exception when calling requests.get %s: %s", uri, exp)
+            response = None
+        self.cache.set(uri, response)
+        return response
+
+    def probe_host_path(self, host, host_path, logger):
+        """[Probe https url of an ingress host/path, falling back to http]
+
+        Args:
+            host ([str]): [Ingress host]
+            host_path ([str]): [Ingress path]
+            logger ([logging.Logger]): [Logger of the namespace being probed]
+
+        Returns:
+            [tuple]: [URI probed last and its response]
+        """
+        if self.cache.https_known_failed(host):
+            logger.debug("https recently failed for %s. Trying http URL.", host)
+        else:
+            uri = "https://" + host + host_path
+            response = self.test_url(uri, logger)
+            if response is not None:
+                return uri, response
+            logger.debug("Request to %s failed. Trying http URL.", uri)
+            self.cache.set_https_failed(host)
+        uri = "http://" + host + host_path
+        return uri, self.test_url(uri, logger)
+
+    def probe(self, targets, logger):
+        """[Probe host/paths concurrently within the deadline]
+
+        Args:
+            targets ([list]): [Ingress (host, path) pairs]
+            logger ([logging.Logger]): [Logger of the namespace being probed]
+
+        Returns:
+            [dict]: [(host, path) to (uri, response), response is None on failure
+                and NOT_PROBED if the probe did not finish within the deadline]
+        """
+        start_time = time.time()
+        futures = {
+            target: self.executor.submit(self.probe_host_path, *target, logger)
+            for target in targets
+        }
+        done, not_done = wait(futures.values(), timeout=self.deadline)
+        results = {}
+        for target, future in futures.items():
+            if future in done:
+                results[target] = future.result()
+            else:
+                future.cancel()
+                results[target] = ("https://" + target[0] + target[1], self.NOT_PROBED)
+        if not_done:
+            logger.warning(
+                "%s ingress probes did not finish within %ss deadline.",
+                len(not_done),
+                self.deadline,
+            )
+        logger.debug(
+            "Probed %s ingress urls in %ss.",
+            len(targets),
+            round(time.time() - start_time, 2),
+        )
+        return results
@@ -0,0 +1,315 @@
+"""[Module to profile api calls and ingress probes of a run]"""
+import bisect
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class CallStats:
+    """
+    Count, errors, bytes and latency histogram of one kind of call
+    """
+
+    # upper bounds of the latency buckets in seconds, the last bucket is unbounded
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    __slots__ = ("count", "errors", "bytes", "total", "max", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(self.BUCKETS) + 1)
+
+    def add(self, latency, nbytes=0, error=False):
+        """[Add one call]
+
+        Args:
+            latency ([float]): [Seconds taken by the call]
+            nbytes ([int]): [Response bytes]
+            error ([bool]): [True if the call failed]
+        """
+        self.count += 1
+        self.errors += int(error)
+        self.bytes += nbytes
+        self.total += latency
+        self.max = max(self.max, latency)
+        self.histogram[bisect.bisect_left(self.BUCKETS, latency)] += 1
+
+    def quantile(self, share):
+        """[Upper bound of the bucket holding the given share of calls]
+
+        Args:
+            share ([float]): [Share of calls, e.g. 0.95]
+
+        Returns:
+            [float]: [Latency in seconds, max latency for the unbounded bucket]
+        """
+        rank, seen = share * self.count, 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank and count:
+                return self.BUCKETS[bucket] if bucket < len(self.BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        """[Stats as dict]"""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "total_s": round(self.total, 4),
+            "max_s": round(self.max, 4),
+            "histogram": {
+                ("le_%s" % bound if bucket < len(self.BUCKETS) else "inf"): count
+                for bucket, (bound, count) in enumerate(
+                    zip(self.BUCKETS + ("inf",), self.histogram)
+                )
+            },
+        }
+
+
+class ProfiledResponse:
+    """
+    Streamed api response which records its call once the body is read
+    """
+
+    def __init__(self, response):
+        self.response = response
+        # set by the profiled call, called with bytes read and error flag
+        self.finish = None
+        self.nbytes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    def record(self, error=False):
+        """[Record the call once, when the body is read, released or failed]
+
+        Args:
+            error ([bool]): [True if reading the body failed]
+        """
+        finish, self.finish = self.finish, None
+        if finish:
+            finish(self.nbytes, error)
+
+    @property
+    def data(self):
+        """[Whole body, read at once]"""
+        try:
+            data = self.response.data
+        except Exception:
+            self.record(error=True)
+            raise
+        self.nbytes = len(data or b"")
+        self.record()
+        return data
+
+    def read(self, *args, **kwargs):
+        """[Read from the body]"""
+        try:
+            data = self.response.read(*args, **kwargs)
+        except Exception:
+            self.record(error=True)
+            raise
+        self.nbytes += len(data or b"")
+        return data
+
+    def stream(self, *args, **kwargs):
+        """[Yield chunks of the body]"""
+        try:
+            for chunk in self.response.stream(*args, **kwargs):
+                self.nbytes += len(chunk)
+                yield chunk
+        except Exception:
+            self.record(error=True)
+            raise
+        self.record()
+
+    def release_conn(self):
+        """[Release the connection of the response]"""
+        self.response.release_conn()
+        self.record()
+
+    def close(self):
+        """[Close the response]"""
+        self.response.close()
+        self.record()
+
+
+class Profiler:
+    """
+    Record every api call and ingress probe by verb, resource and wrench class
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+        # bytes read by rest_client for the api call running in this thread
+        self.local = threading.local()
+
+    @staticmethod
+    def caller_class():
+        """[Innermost wrench, snapshot, prober or collector class on the call stack]
+
+        Returns:
+            [str]: [Class name, "-" if the call is not made by one]
+        """
+        frame = sys._getframe(2)
+        while frame:
+            obj = frame.f_locals.get("self")
+            if obj is not None:
+                name = type(obj).__name__
+                if name.endswith(("Wrench", "Snapshot", "Prober", "Collector")):
+                    return name
+            frame = frame.f_back
+        return "-"
+
+    def record(self, key, latency, nbytes=0, error=False):
+        """[Record a call]
+
+        Args:
+            key ([tuple]): [Wrench class, verb and resource of the call]
+            latency ([float]): [Seconds taken by the call]
+            nbytes ([int]): [Response bytes]
+            error ([bool]): [True if the call failed]
+        """
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = CallStats()
+            stats.add(latency, nbytes, error)
+
+    def instrument_client(self, kube_client):
+        """[Wrap the api client of a KubeClient to record its calls]
+
+        Args:
+            kube_client ([KubeClient]): [Shared api client session]
+        """
+        api_client = kube_client.api_client
+        call_api = api_client.call_api
+        rest_request = api_client.rest_client.request
+
+        def profiled_request(*args, **kwargs):
+            response = rest_request(*args, **kwargs)
+            if not kwargs.get("_preload_content", True):
+                # streamed bodies are read by the caller, counted as they are read
+                return ProfiledResponse(response)
+            self.local.bytes = getattr(self.local, "bytes", 0) + len(
+                response.data or b""
+            )
+            return response
+
+        def profiled_call_api(resource_path, method, *args, **kwargs):
+            key = (self.caller_class(), method, resource_path)
+            self.local.bytes, error, streamed = 0, False, False
+            start_time = time.perf_counter()
+
+            def finish(nbytes, failed):
+                self.record(key, time.perf_counter() - start_time, nbytes, failed)
+
+            try:
+                response = call_api(resource_path, method, *args, **kwargs)
+                if isinstance(response, ProfiledResponse):
+                    # recorded with the full read time once the body is read
+                    response.finish, streamed = finish, True
+                return response
+            except Exception:
+                error = True
+                raise
+            finally:
+                if not streamed:
+                    finish(self.local.bytes, error)
+
+        api_client.rest_client.request = profiled_request
+        api_client.call_api = profiled_call_api
+
+    def instrument_prober(self, prober):
+        """[Wrap the http session of an IngressProber to record its probes]
+
+        Args:
+            prober ([IngressProber]): [Ingress prober of the run]
+        """
+        session_get = prober.session.get
+
+        def profiled_get(uri, *args, **kwargs):
+            url = urlparse(uri)
+            key = ("IngressProber", "PROBE", "%s://%s" % (url.scheme, url.netloc))
+            start_time = time.perf_counter()
+            nbytes, error = 0, False
+            try:
+                response = session_get(uri, *args, **kwargs)
+                nbytes = len(response.content or b"")
+                return response
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.record(key, time.perf_counter() - start_time, nbytes, error)
+
+        prober.session.get = profiled_get
+
+    def to_list(self):
+        """[Recorded stats, slowest first]
+
+        Returns:
+            [list]: [Stats of each wrench class, verb and resource]
+        """
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda item: -item[1].total)
+            return [
+                dict(wrench=wrench, verb=verb, resource=resource, **stats.to_dict())
+                for (wrench, verb, resource), stats in items
+            ]
+
+    def report(self, format="table", stream=sys.stdout):
+        """[Print the recorded stats]
+
+        Args:
+            format ([str]): [table|json]
+            stream ([file]): [Stream to print to]
+        """
+        if format == "json":
+            print(json.dumps({"profile": self.to_list()}), file=stream)
+            return
+        header = "%-20s %-6s %-58s %7s %6s %10s %9s %8s %8s %8s"
+        print(
+            "\n"
+            + header
+            % (
+                "WRENCH",
+                "VERB",
+                "RESOURCE",
+                "CALLS",
+                "ERRORS",
+                "BYTES",
+                "TOTAL_S",
+                "AVG_MS",
+                "P95_MS",
+                "MAX_MS",
+            ),
+            file=stream,
+        )
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda item: -item[1].total)
+            for (wrench, verb, resource), stats in items:
+                print(
+                    header
+                    % (
+                        wrench,
+                        verb,
+                        resource,
+                        stats.count,
+                        stats.errors,
+                        stats.bytes,
+                        round(stats.total, 3),
+                        round(stats.total / stats.count * 1000, 1),
+                        round(stats.quantile(0.95) * 1000, 1),
+                        round(stats.max * 1000, 1),
+                    ),
+                    file=stream,
+                )
@@ -0,0 +1,59 @@
+"""[Module to parse Kubernetes resource quantities]"""
+import functools
+import re
+from fractions import Fraction
+
+QUANTITY = re.compile(
+    r"^(?P<number>[+-]?(?:\d+\.?\d*|\.\d+))"
+    r"(?:(?P<exponent>[eE][+-]?\d+)|(?P<suffix>Ki|Mi|Gi|Ti|Pi|Ei|n|u|m|k|M|G|T|P|E))?$"
+)
+
+
+class Quantity:
+    """
+    Exact parser of quantities, e.g. 100m, 1.5, 500M, 2Ti, 100n or 1e3
+    """
+
+    SUFFIXES = {
+        "": 1,
+        "n": Fraction(1, 10**9),
+        "u": Fraction(1, 10**6),
+        "m": Fraction(1, 10**3),
+        "k": 10**3,
+        "M": 10**6,
+        "G": 10**9,
+        "T": 10**12,
+        "P": 10**15,
+        "E": 10**18,
+        "Ki": 2**10,
+        "Mi": 2**20,
+        "Gi": 2**30,
+        "Ti": 2**40,
+        "Pi": 2**50,
+        "Ei": 2**60,
+    }
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def parse(quantity):
+        """[Parse a quantity into its exact value]
+
+        Args:
+            quantity ([str/int]): [Quantity, e.g. 250m or 1Gi]
+
+        Raises:
+            ValueError: [If the quantity is not valid]
+
+        Returns:
+            [Fraction]: [Value in base units, e.g. cores or bytes]
+        """
+        quantity_str = str(quantity).strip()
+        if quantity_str == "":
+            return Fraction(0)
+        match = QUANTITY.match(quantity_str)
+        if not match:
+            raise ValueError("Invalid quantity: %r" % quantity)
+        value = Fraction(match.group("number"))
+        if match.group("exponent"):
+            return value * Fraction(10) ** int(match.group("exponent")[1:])
+        return value * Quantity.SUFFIXES[match.group("suffix") or ""]
@@ -1,31 +1,38 @@
 """[Module to get namespace quotas defined]"""
-import kubernetes.client
-from kubernetes.client.rest import ApiException
-from .output import Output
+from .quantity import Quantity
+from .snapshot import ClusterSnapshot
+from .findings import FindingSink
 
 
 class ResourceQuotaWrench:
     """[Class to process resource quota details]"""
 
-    def __init__(self, k8s_config, namespace, logger):
-        self.k8s_config = k8s_config
+    def __init__(
+        self, kube_client, namespace, logger, snapshot=None, sink=None, threshold=90
+    ):
+        self.kube_client = kube_client
         self.namespace = namespace
         self.logger = logger
-        with kubernetes.client.ApiClient(k8s_config) as api_client:
-            self.core = kubernetes.client.CoreV1Api(api_client)
+        self.snapshot = snapshot or ClusterSnapshot(kube_client, logger)
+        self.sink = sink or FindingSink()
+        # usage percentage above which a quota is reported
+        self.threshold = threshold
+        self.core = kube_client.core
 
     def quota_usage_pctg(self, quota_used, quota_hard_limit, quota_name):
         """[Quota usage percentage]
 
         Args:
-            quota_used ([str]): [Quota used]
-            quota_hard_limit ([str]): [Quota hard limit set]
+            quota_used ([Fraction]): [Quota used]
+            quota_hard_limit ([Fraction]): [Quota hard limit set]
 
         Returns:
-            [int]: [Quota usage percentage]
+            [float]: [Quota usage percentage]
         """
         try:
-            quota_usage_percentage = round((quota_used / quota_hard_limit * 100), 3)
+            quota_usage_percentage = round(
+                float(quota_used / quota_hard_limit * 100), 3
+            )
             return quota_usage_percentage
         except ZeroDivisionError:
             self.logger.warning(
@@ -34,38 +41,21 @@ class ResourceQuotaWrench:
             return 0
 
     def quota_usage_status(
-        self, quota_type, ns_quota_name, quota_used, quota_hard_limit
+        self, quota_type, ns_quota_name, quota_used, quota_hard_limit, quota_usage
     ):
         """[Quota usage status]
 
         Args:
-            quota_usage ([int]): [Quota usage percentage]
             quota_type ([str]): [Quota type]
-            quota_name ([str]): [Quota name]
-            used_quota ([str]): [Quota used]
-            hard_quota ([str]): [Quota hard limit set]
+            ns_quota_name ([str]): [Quota name]
+            quota_used ([str]): [Quota used]
+            quota_hard_limit ([str]): [Quota hard limit set]
+            quota_usage ([float]): [Quota usage percentage]
 
         Returns:
-            [list]: [Quota usage status]
+            [Finding]: [Quota usage status]
         """
-        quota_usage_status = []
-        if "cpu" in quota_type:
-            quota_usage = self.quota_usage_pctg(
-                Output.convert_cpu(quota_used),
-                Output.convert_cpu(quota_hard_limit),
-                ns_quota_name,
-            )
-        elif "memory" in quota_type:
-            quota_usage = self.quota_usage_pctg(
-                Output.convert_memory(quota_used),
-                Output.convert_memory(quota_hard_limit),
-                ns_quota_name,
-            )
-        else:
-            quota_usage = self.quota_usage_pctg(
-                int(quota_used), int(quota_hard_limit), ns_quota_name
-            )
-        if quota_usage > 90:
+        if quota_usage > self.threshold:
             self.logger.warning(
                 "ResourceQuota %s/%s %s is at %s percent. " "Used/Hard limit: %s/%s",
                 self.namespace,
@@ -75,9 +65,6 @@ class ResourceQuotaWrench:
                 quota_used,
                 quota_hard_limit,
             )
-            quota_usage_status.append(
-                [self.namespace, "high " + quota_type, quota_usage]
-            )
         else:
             self.logger.info(
                 "ResourceQuota %s/%s %s is at %s percent which is"
@@ -89,69 +76,84 @@ class ResourceQuotaWrench:
                 quota_used,
                 quota_hard_limit,
             )
+        quota_usage_status = self.sink.report(
+            self.namespace,
+            "ResourceQuota",
+            ns_quota_name + "/" + quota_type,
+            "quota_usage_status",
+            "QUOTA_HIGH" if quota_usage > self.threshold else "QUOTA_OK",
+            "warning" if quota_usage > self.threshold else "info",
+            "%s is at %s percent. Used/Hard limit: %s/%s"
+            % (quota_type, quota_usage, quota_used, quota_hard_limit),
+        )
         return quota_usage_status
 
+    def quota_usages(self, quotas):
+        """[Usage percentage of every resource of every quota in one pass]
+
+        Args:
+            quotas ([list]): [Resource quotas of the namespace, with status]
+
+        Returns:
+            [list]: [(type, quota name, used, hard limit, usage percentage)]
+        """
+        usages = []
+        for quota in quotas:
+            hard = (quota.status.hard if quota.status else None) or {}
+            used = (quota.status.used if quota.status else None) or {}
+            for quota_type, quota_hard_limit in hard.items():
+                quota_used = used.get(quota_type, "0")
+                try:
+                    # cpu, memory, storage and object counts are all quantities
+                    quota_usage = self.quota_usage_pctg(
+                        Quantity.parse(quota_used),
+                        Quantity.parse(quota_hard_limit),
+                        quota.metadata.name,
+                    )
+                except ValueError as exp:
+                    self.logger.warning(
+                        "Could not evaluate ResourceQuota %s/%s %s: %s",
+                        self.namespace,
+                        quota.metadata.name,
+                        quota_type,
+                        exp,
+                    )
+                    continue
+                usages.append(
+                    (
+                        quota_type,
+                        quota.metadata.name,
+                        quota_used,
+                        quota_hard_limit,
+                        quota_usage,
+                    )
+                )
+        return usages
+
     def resource_quota_wrench(self):
         """[Get quota status for the namespace]
 
         Returns:
-            [list]: [Namespace quota status]
+            [list]: [Namespace quota status findings]
         """
         self.logger.debug(
             "Checking if namespace %s has resource limitation due to quota limits.",
             self.namespace,
         )
-        self.logger.debug("Fetching %s namespace resource quota data.", self.namespace)
-        quota_chk_result = []
-        try:
-            ns_quota_list = self.core.list_namespaced_resource_quota(self.namespace)
-            if len(ns_quota_list.items) > 0:
-                self.logger.info(
-                    "%s resource quotas found in %s namespace. Checking for quota limits.",
-                    len(ns_quota_list.items),
-                    self.namespace,
-                )
-                for quota in ns_quota_list.items:
-                    ns_quota_name = quota.metadata.name
-                    try:
-                        ns_quota_status = (
-                            self.core.read_namespaced_resource_quota_status(
-                                ns_quota_name, self.namespace
-                            )
-                        )
-                        self.logger.debug(
-                            "Fetched %s namespace resource quota %s status: %s",
-                            self.namespace,
-                            ns_quota_name,
-                            ns_quota_status.status,
-                        )
-                    except ApiException as exp:
-                        self.logger.warning(
-                            "Exception when calling CoreV1Api>"
-                            "read_namespaced_resource_quota_status: %s",
-                            exp,
-                        )
-
-                    for key in ns_quota_status.status.hard:
-                        quota_used = ns_quota_status.status.used[key]
-                        quota_hard_limit = ns_quota_status.status.hard[key]
-                        quota_type = key
-
-                        ResourceQuotaWrench.quota_usage_status(
-                            self,
-                            quota_type,
-                            ns_quota_name,
-                            quota_used,
-                            quota_hard_limit,
-                        )
-            else:
-                self.logger.info(
-                    "No resource quota found in namespace %s.",
-                    self.namespace,
-                )
-        except ApiException as exp:
-            self.logger.error(
-                "Exception when calling CoreV1Api->read_namespaced_resource_quota: %s\n",
-                exp,
+        # list responses carry status.hard and status.used, no per quota read is needed
+        ns_quota_list = self.snapshot.resource_quotas(self.namespace)
+        if not ns_quota_list.items:
+            self.logger.info(
+                "No resource quota found in namespace %s.",
+                self.namespace,
             )
-        return quota_chk_result
+            return []
+        self.logger.info(
+            "%s resource quotas found in %s namespace. Checking for quota limits.",
+            len(ns_quota_list.items),
+            self.namespace,
+        )
+        return [
+            self.quota_usage_status(*usage)
+            for usage in self.quota_usages(ns_quota_list.items)
+        ]
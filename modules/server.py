@@ -0,0 +1,316 @@
+"""[Module to serve diagnoses and finding metrics over HTTP]"""
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from .findings import FindingSink
+from .pods import PodWrench
+from .resource_quota import ResourceQuotaWrench
+from .service import ServiceWrench
+from .watch import WatchWrench
+
+
+class DiagnosisHandler(BaseHTTPRequestHandler):
+    """
+    Pass GET requests to the event loop of the ServeWrench and write its response
+    """
+
+    def do_GET(self):
+        """[Answer a GET request]"""
+        url = urlparse(self.path)
+        reply = queue.Queue(maxsize=1)
+        self.server.wrench.events.put(
+            ("request", url.path, (parse_qs(url.query), reply))
+        )
+        try:
+            status, content_type, body = reply.get(timeout=self.server.reply_timeout)
+        except queue.Empty:
+            status, content_type = 503, "application/json"
+            body = json.dumps(
+                {
+                    "error": "No response within %ss, the diagnosis is starting or "
+                    "busy." % self.server.reply_timeout
+                }
+            ).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """[Log requests at debug level instead of writing them to stderr]"""
+        self.server.wrench.logger.debug("%s %s", self.address_string(), format % args)
+
+
+class ServeWrench(WatchWrench):
+    """
+    Keep the snapshot current with watches and diagnose namespaces from it on request
+    """
+
+    PATHS = ["/diagnose", "/metrics", "/healthz"]
+
+    # checks not run per request, their findings come from the watch loop
+    CARRIED_CHECKS = ("ingress_wrench", "container_log_root_cause")
+
+    def __init__(self, *args, address="0.0.0.0:8080", slow_workers=4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.address = address
+        self.requests = {}
+        self.watch_events = {}
+        # ingress probes and log fetches of changed pods run here, so they can not
+        # hold up the event loop answering requests
+        self.executor = ThreadPoolExecutor(max_workers=slow_workers)
+        # pods whose probes and log fetches are running, by tracking key
+        self.pending = {}
+        # expired secret, configmap, PV and StorageClass lists are refreshed in
+        # background, requests are answered from the cache meanwhile
+        self.snapshot.refresher = self.executor
+
+    def check_pods(self, namespace, pods):
+        """[Run the snapshot checks of pods, probes and log fetches run in background]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            pods ([list]): [Pod objects of the namespace]
+        """
+        checked = self.pod_checks(namespace, pods)
+        slow = {}
+        for key, (pod, findings, probe_targets, log_targets) in checked.items():
+            if probe_targets or log_targets:
+                # findings are tracked once the background checks are done, a
+                # newer check of the pod replaces this one
+                self.pending[key] = pod
+                slow[key] = checked[key]
+            else:
+                self.pending.pop(key, None)
+                self.track_found(key, findings)
+        if slow:
+            self.executor.submit(self.slow_checks, namespace, slow)
+
+    def slow_checks(self, namespace, checked):
+        """[Probe ingress urls and scan container logs of pods, runs in a thread]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            checked ([dict]): [Pod checks by pod key, as returned by pod_checks]
+        """
+        try:
+            found = self.batch_checks(namespace, checked)
+        except Exception:
+            self.logger.exception("Probes and logs in namespace %s failed.", namespace)
+            found = {}
+        for key, (pod, findings, _, _) in checked.items():
+            self.events.put(("checked", key, (pod, findings + found.get(key, []))))
+
+    def diagnose(self, namespace):
+        """[Run pod, service and quota checks of a namespace on the snapshot]
+
+        Args:
+            namespace ([str]): [Namespace name]
+
+        Returns:
+            [list]: [Findings of the namespace]
+        """
+        sink = FindingSink()
+        sink.collected = []
+        pod_wrench = PodWrench(
+            self.kube_client,
+            namespace,
+            self.check_logger,
+            self.snapshot,
+            self.prober,
+            sink,
+            self.collector,
+        )
+        svc = ServiceWrench(
+            self.kube_client,
+            namespace,
+            self.check_logger,
+            self.snapshot,
+            self.prober,
+            sink,
+        )
+        for pod in self.snapshot.pods(namespace).items:
+            pod_wrench.check_pod_status(pod, svc)
+        ResourceQuotaWrench(
+            self.kube_client,
+            namespace,
+            self.check_logger,
+            self.snapshot,
+            sink,
+            self.quota_threshold,
+        ).resource_quota_wrench()
+        self.check_logger.handlers[0].flush()
+        # ingress probes and container logs are not run per request, their
+        # findings are the ones the watch loop got when the objects last changed
+        svc.ingress.probe_targets = {}
+        pod_wrench.container.log_targets = []
+        findings = {finding.key: finding for finding in sink.collected}
+        for (_, ns_name, _), tracked in self.findings.items():
+            if ns_name == namespace:
+                for key, finding in tracked.items():
+                    if finding.check in self.CARRIED_CHECKS:
+                        findings.setdefault(key, finding)
+        return list(findings.values())
+
+    def diagnose_response(self, params):
+        """[Response of /diagnose]
+
+        Args:
+            params ([dict]): [Query parameters]
+
+        Returns:
+            [tuple]: [Status code, content type and body]
+        """
+        namespace = (params.get("namespace") or [None])[0]
+        if not namespace:
+            return 400, {"error": "namespace parameter is required."}
+        if self.namespace and namespace != self.namespace:
+            return 404, {"error": "Namespace %s is not watched." % namespace}
+        if namespace not in self.snapshot.namespace_names():
+            return 404, {"error": "No resources of namespace %s in cache." % namespace}
+        start_time = time.perf_counter()
+        findings = self.diagnose(namespace)
+        return 200, {
+            "namespace": namespace,
+            "took_ms": round((time.perf_counter() - start_time) * 1000, 2),
+            "findings": [finding.to_dict() for finding in findings],
+        }
+
+    @staticmethod
+    def label_value(value):
+        """[Escape a Prometheus label value]"""
+        return (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+
+    def metrics(self):
+        """[Current findings and counters in Prometheus text format]
+
+        Returns:
+            [str]: [Metrics text]
+        """
+        current = {}
+        for tracked in self.findings.values():
+            for finding in tracked.values():
+                labels = (
+                    finding.namespace,
+                    finding.kind,
+                    finding.check,
+                    finding.status,
+                    finding.severity,
+                )
+                current[labels] = current.get(labels, 0) + 1
+        lines = [
+            "# HELP kube_wrench_findings Current findings which are not info.",
+            "# TYPE kube_wrench_findings gauge",
+        ]
+        for labels, count in sorted(current.items()):
+            lines.append(
+                'kube_wrench_findings{namespace="%s",kind="%s",check="%s",'
+                'status="%s",severity="%s"} %s'
+                % (tuple(self.label_value(label) for label in labels) + (count,))
+            )
+        counters = [
+            (
+                "kube_wrench_finding_changes_total",
+                "Findings which appeared or cleared since start.",
+                "state",
+                self.finding_changes,
+            ),
+            (
+                "kube_wrench_watch_events_total",
+                "Watch events applied to the cache.",
+                "kind",
+                self.watch_events,
+            ),
+            (
+                "kube_wrench_requests_total",
+                "HTTP requests answered.",
+                "path",
+                self.requests,
+            ),
+        ]
+        for name, help_text, label, values in counters:
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s counter" % name)
+            for value, count in sorted(values.items()):
+                lines.append(
+                    '%s{%s="%s"} %s' % (name, label, self.label_value(value), count)
+                )
+        return "\n".join(lines) + "\n"
+
+    def respond(self, path, params):
+        """[Response of a request]
+
+        Args:
+            path ([str]): [Request path]
+            params ([dict]): [Query parameters]
+
+        Returns:
+            [tuple]: [Status code, content type and body]
+        """
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.metrics().encode()
+        if path == "/diagnose":
+            status, body = self.diagnose_response(params)
+        elif path == "/healthz":
+            status, body = 200, {"status": "ok"}
+        else:
+            status, body = 404, {"error": "Unknown path %s." % path}
+        return status, "application/json", json.dumps(body).encode()
+
+    def handle(self, kind, event_type, resource):
+        """[Answer a request, track background checks, or apply a watch event]
+
+        Args:
+            kind ([str]): [Resource kind, request for HTTP requests, checked for
+                finished background checks]
+            event_type ([str]): [Watch event type, request path or pod key]
+            resource ([dict]): [Resource object, query parameters and reply queue, or
+                pod and its findings]
+        """
+        if kind == "checked":
+            pod, findings = resource
+            # results of pods checked again or deleted since are dropped
+            if self.pending.get(event_type) is pod:
+                del self.pending[event_type]
+                self.track_found(event_type, findings)
+            return
+        if kind != "request":
+            if kind == "pods" and event_type == "DELETED":
+                self.pending.pop(
+                    ("Pod", resource.metadata.namespace, resource.metadata.name), None
+                )
+            self.watch_events[kind] = self.watch_events.get(kind, 0) + 1
+            super().handle(kind, event_type, resource)
+            return
+        params, reply = resource
+        # unknown paths share one label so scans can not grow the metrics
+        path = event_type if event_type in self.PATHS else "other"
+        self.requests[path] = self.requests.get(path, 0) + 1
+        try:
+            reply.put(self.respond(event_type, params))
+        except Exception:
+            self.logger.exception("Request %s failed.", event_type)
+            reply.put((500, "application/json", b'{"error": "Request failed."}'))
+
+    def serve_wrench(self):
+        """[Serve requests and keep the snapshot current until interrupted]"""
+        self.logger.info("Starting kube-wrench in server mode.")
+        host, _, port = self.address.rpartition(":")
+        server = ThreadingHTTPServer((host or "0.0.0.0", int(port)), DiagnosisHandler)
+        server.daemon_threads = True
+        server.wrench = self
+        # requests wait for the event loop, which starts after the first diagnosis
+        server.reply_timeout = 30
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.logger.info("Serving /diagnose, /metrics and /healthz on %s.", self.address)
+        try:
+            self.watch_wrench()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,28 +1,89 @@
 """[Module to process service details]"""
-import kubernetes.client
 from kubernetes.client.rest import ApiException
 from .ingress import IngressWrench
+from .findings import FindingSink
+
+
+class SelectorIndex:
+    """
+    Inverted index of service selectors by label key and value
+    """
+
+    def __init__(self, services, logger):
+        self.logger = logger
+        self.services = {}
+        self.selector_size = {}
+        self.label_index = {}
+        for svc in services:
+            if not svc.spec.selector:
+                self.logger.debug("No selector found in service %s.", svc.metadata.name)
+                continue
+            self.services[svc.metadata.name] = svc
+            self.selector_size[svc.metadata.name] = len(svc.spec.selector)
+            for label in svc.spec.selector.items():
+                self.label_index.setdefault(label, set()).add(svc.metadata.name)
+
+    def match(self, labels):
+        """[Get services whose selector matches the labels exactly]
+
+        Args:
+            labels ([dict]): [Pod labels]
+
+        Returns:
+            [list]: [Matching services]
+        """
+        label_hits = {}
+        for label in (labels or {}).items():
+            for svc_name in self.label_index.get(label, ()):
+                label_hits[svc_name] = label_hits.get(svc_name, 0) + 1
+        # a service matches when every key/value pair of its selector is on the pod
+        return [
+            self.services[svc_name]
+            for svc_name in sorted(label_hits)
+            if label_hits[svc_name] == self.selector_size[svc_name]
+        ]
 
 
 class ServiceWrench:
     """[Class to get service details]"""
 
-    def __init__(self, k8s_config, namespace, logger):
-        self.k8s_config = k8s_config
+    def __init__(
+        self, kube_client, namespace, logger, snapshot=None, prober=None, sink=None
+    ):
+        self.kube_client = kube_client
         self.namespace = namespace
         self.logger = logger
-        with kubernetes.client.ApiClient(k8s_config) as api_client:
-            self.core = kubernetes.client.CoreV1Api(api_client)
+        self.snapshot = snapshot
+        self.sink = sink or FindingSink()
+        self.core = kube_client.core
+        self.ingress = IngressWrench(
+            kube_client, namespace, logger, snapshot, prober, self.sink
+        )
+        self.services = self.get_services()
+        self.selector_index = SelectorIndex(
+            self.services.items if self.services else [], logger
+        )
+
+    def get_services(self):
+        """[Get all services in the namespace]
 
+        Returns:
+            [list]: [List of services]
+        """
+        if self.snapshot:
+            services = self.snapshot.services(self.namespace)
+            if services is not None:
+                return services
         self.logger.debug("Fetching %s namespace services data.", self.namespace)
         try:
-            self.services = self.core.list_namespaced_service(
+            return self.core.list_namespaced_service(
                 self.namespace, timeout_seconds=10
             )
         except ApiException as exp:
             self.logger.warning(
                 "Exception when calling CoreV1Api->list_namespaced_service: %s", exp
             )
+            return None
 
     def pod_svc_port_chk(self, pod, svc):
         """[Pod and service port mapping check]
@@ -30,7 +91,11 @@ class ServiceWrench:
         Args:
             pod ([dict]): [Pod details in dict]
             svc ([dict]): [Service details in dict]
+
+        Returns:
+            [list]: [Findings of container ports not matching the service]
         """
+        port_findings = []
         self.logger.debug(
             "Comparing pod %s and it's service %s port mappings in namespace %s.",
             pod.metadata.name,
@@ -82,12 +147,26 @@ class ServiceWrench:
                             svc.metadata.name,
                             svc.spec.ports,
                         )
+                        port_findings.append(
+                            self.sink.report(
+                                self.namespace,
+                                "Service",
+                                svc.metadata.name,
+                                "pod_svc_port_chk",
+                                "PORT_NOT_MATCHING",
+                                "warning",
+                                "containerPort %s of container %s in pod %s is not matching"
+                                " to any service port."
+                                % (port.container_port, cont.name, pod.metadata.name),
+                            )
+                        )
             else:
                 self.logger.info(
                     "containerPort not defined for container %s in pod %s.",
                     cont.name,
                     pod.metadata.name,
                 )
+        return port_findings
 
     def svc_type_check(self, svc, svc_mapped_to_pod, pod):
         """[Check service type]
@@ -120,56 +199,69 @@ class ServiceWrench:
 
         Args:
             pod ([dict]): [Pod details in dict]
+
+        Returns:
+            [list]: [Service findings of the pod]
         """
         self.logger.debug(
             "Analyzing service mapped to pod %s/%s.", self.namespace, pod.metadata.name
         )
-        svc_mapped_to_pod = ""
-        for svc in self.services.items:
-            mapping = []
-            try:
-                for selector_name in svc.spec.selector:
-                    try:
-                        if (
-                            svc.spec.selector[selector_name]
-                            in pod.metadata.labels[selector_name]
-                        ):
-                            mapping.append(True)
-                        else:
-                            mapping.append(False)
-                    except KeyError:
-                        self.logger.debug(
-                            "Label %s not found in pod %s.",
-                            selector_name,
-                            pod.metadata.name,
-                        )
-            except TypeError:
-                self.logger.debug("No selector found in service %s.", svc.metadata.name)
-
-            if all(mapping) and mapping:
-                svc_mapped_to_pod = svc.metadata.name
-                self.svc_type_check(svc, svc_mapped_to_pod, pod)
-                self.pod_svc_port_chk(pod, svc)
-                # pod IP address allocation check
-                if pod.status.pod_ip:
-                    self.logger.info(
-                        "Pod %s/%s has IP address allocated: %s.",
-                        self.namespace,
-                        pod.metadata.name,
-                        pod.status.pod_ip,
-                    )
-                else:
-                    self.logger.warning(
-                        "Pod %s/%s has no IP address allocated.",
+        svc_mapped_to_pod, svc_findings = "", []
+        for svc in self.selector_index.match(pod.metadata.labels):
+            svc_mapped_to_pod = svc.metadata.name
+            self.svc_type_check(svc, svc_mapped_to_pod, pod)
+            svc_findings.append(
+                self.sink.report(
+                    self.namespace,
+                    "Pod",
+                    pod.metadata.name,
+                    "service_wrench",
+                    "SERVICE_MAPPED",
+                    "info",
+                    "Service %s is mapped to pod." % svc_mapped_to_pod,
+                )
+            )
+            svc_findings += self.pod_svc_port_chk(pod, svc)
+            # pod IP address allocation check
+            if pod.status.pod_ip:
+                self.logger.info(
+                    "Pod %s/%s has IP address allocated: %s.",
+                    self.namespace,
+                    pod.metadata.name,
+                    pod.status.pod_ip,
+                )
+            else:
+                self.logger.warning(
+                    "Pod %s/%s has no IP address allocated.",
+                    self.namespace,
+                    pod.metadata.name,
+                )
+                svc_findings.append(
+                    self.sink.report(
                         self.namespace,
+                        "Pod",
                         pod.metadata.name,
+                        "service_wrench",
+                        "NO_POD_IP",
+                        "warning",
+                        "Pod has no IP address allocated.",
                     )
-                IngressWrench(
-                    self.k8s_config, self.namespace, self.logger
-                ).ingress_wrench(svc)
+                )
+            self.ingress.ingress_wrench(svc)
 
         if not svc_mapped_to_pod:
             self.logger.info(
                 "No service is mapped to pod %s/%s.", self.namespace, pod.metadata.name
             )
-        return svc_mapped_to_pod
+            svc_findings.append(
+                self.sink.report(
+                    self.namespace,
+                    "Pod",
+                    pod.metadata.name,
+                    "service_wrench",
+                    "NO_SERVICE",
+                    "info",
+                    "No service is mapped to pod.",
+                )
+            )
+        return svc_findings
@@ -0,0 +1,728 @@
+"""[Module to take a cluster-wide snapshot of resources]"""
+import json
+import threading
+import time
+from kubernetes.client.rest import ApiException
+from .events import EventIndex
+
+
+class ResourceList:
+    """[Namespace scoped view of a cluster-wide list response]"""
+
+    def __init__(self, items):
+        self.items = items
+
+
+class SnapshotData:
+    """[Response-like holder of saved resources for ApiClient.deserialize]"""
+
+    def __init__(self, data):
+        self.data = data
+
+
+class ClusterSnapshot:
+    """
+    Fetch each resource kind once for the whole cluster and index it by namespace
+    """
+
+    # model class of each kind, used to load saved snapshots
+    KIND_TYPES = {
+        "pods": "V1Pod",
+        "services": "V1Service",
+        "ingresses": "V1Ingress",
+        "resourcequotas": "V1ResourceQuota",
+        "events": "CoreV1Event",
+        "persistentvolumeclaims": "V1PersistentVolumeClaim",
+        "persistentvolumes": "V1PersistentVolume",
+        "storageclasses": "V1StorageClass",
+    }
+
+    # involved object kind of each kind, to drop events of deleted objects
+    OBJECT_KINDS = {
+        "pods": "Pod",
+        "services": "Service",
+        "ingresses": "Ingress",
+        "resourcequotas": "ResourceQuota",
+        "persistentvolumeclaims": "PersistentVolumeClaim",
+    }
+
+    # kinds of which only object names are listed, their data is never fetched
+    NAME_PATHS = {
+        "secrets": "/api/v1/namespaces/{namespace}/secrets",
+        "configmaps": "/api/v1/namespaces/{namespace}/configmaps",
+    }
+
+    def __init__(self, kube_client, logger):
+        self.kube_client = kube_client
+        self.logger = logger
+        self.core = kube_client.core
+        self.network = kube_client.network
+        self.storage = kube_client.storage
+        self.index = {}
+        self.index_scope = {}
+        self.resource_versions = {}
+        self.namespaced_index = {}
+        # cluster scoped kinds by name, listed once on first use
+        self.cluster_index = {}
+        # names of kinds only checked for existence, e.g. secrets
+        self.name_index = {}
+        self.event_index = EventIndex()
+        self.event_namespaces = set()
+        self.all_events_indexed = False
+        # set when loaded from a saved snapshot, resources are not fetched live
+        self.offline = False
+        # data saved along with the resources, e.g. findings of the run
+        self.extra = {}
+        # seconds lazily listed names and cluster scoped kinds are reused, None
+        # for the whole run. Long running modes set it so they see changes
+        self.cache_ttl = None
+        self.cached_at = {}
+        # executor listing expired entries again, None to list them inline
+        self.refresher = None
+        self.refreshing = set()
+        # namespaces may be processed by several worker threads. The lock guards
+        # the caches, lists run under the lock of their kind and namespace only
+        self.lock = threading.Lock()
+        self.list_locks = {}
+
+    def expired(self, kind, namespace=None):
+        """[Check if a lazily listed kind has to be listed again]
+
+        Args:
+            kind ([str]): [Resource kind]
+            namespace ([str]): [Namespace name, None for cluster scoped kinds]
+
+        Returns:
+            [bool]: [True if listed more than cache_ttl seconds ago]
+        """
+        if self.cache_ttl is None or self.offline:
+            return False
+        cached_at = self.cached_at.get((kind, namespace), 0)
+        return time.monotonic() - cached_at >= self.cache_ttl
+
+    def list_lock(self, kind, namespace=None):
+        """[Lock of a lazily listed kind and namespace, so each is listed once]
+
+        Args:
+            kind ([str]): [Resource kind]
+            namespace ([str]): [Namespace name, None for cluster scoped kinds]
+
+        Returns:
+            [threading.Lock]: [Lock of the kind and namespace]
+        """
+        with self.lock:
+            return self.list_locks.setdefault((kind, namespace), threading.Lock())
+
+    def list_funcs(self, namespace=None):
+        """[List functions of the snapshot resource kinds]
+
+        Args:
+            namespace ([str]): [Namespace name, None for all namespaces]
+
+        Returns:
+            [dict]: [Resource kind to list function and its arguments]
+        """
+        if namespace:
+            return {
+                "pods": (self.core.list_namespaced_pod, namespace),
+                "services": (self.core.list_namespaced_service, namespace),
+                "ingresses": (self.network.list_namespaced_ingress, namespace),
+                "resourcequotas": (self.core.list_namespaced_resource_quota, namespace),
+                "events": (self.core.list_namespaced_event, namespace),
+                "persistentvolumeclaims": (
+                    self.core.list_namespaced_persistent_volume_claim,
+                    namespace,
+                ),
+            }
+        return {
+            "pods": (self.core.list_pod_for_all_namespaces,),
+            "services": (self.core.list_service_for_all_namespaces,),
+            "ingresses": (self.network.list_ingress_for_all_namespaces,),
+            "resourcequotas": (self.core.list_resource_quota_for_all_namespaces,),
+            "events": (self.core.list_event_for_all_namespaces,),
+            "persistentvolumeclaims": (
+                self.core.list_persistent_volume_claim_for_all_namespaces,
+            ),
+        }
+
+    def list_all(self, kind, list_func, *args, keep=None, list_meta=None):
+        """[List a resource kind and index it by namespace]
+
+        Args:
+            kind ([str]): [Resource kind]
+            list_func ([function]): [List function of the API]
+            keep ([function]): [Called with each listed resource, returns what is
+                indexed under its name, False to skip it. None to index all.]
+            list_meta ([dict]): [Filled with resource_version of the list instead of
+                storing it in resource_versions, e.g. for lists of watch threads]
+
+        Returns:
+            [dict]: [Resources indexed by namespace and name]
+        """
+        self.logger.debug("Fetching %s data for %s.", kind, args or "all namespaces")
+        kind_index, count, meta = {}, 0, {}
+        try:
+            for resource in self.kube_client.list_paged(
+                list_func, *args, list_meta=meta, timeout_seconds=10
+            ):
+                count += 1
+                indexed = keep(resource) if keep else resource
+                if indexed is False:
+                    continue
+                ns_index = kind_index.setdefault(resource.metadata.namespace, {})
+                ns_index[resource.metadata.name] = indexed
+        except ApiException as exp:
+            self.logger.warning("Exception when listing %s: %s", kind, exp)
+            return None
+        if list_meta is None:
+            self.resource_versions[kind] = meta.get("resource_version")
+        else:
+            list_meta.update(meta)
+        self.logger.debug(
+            "Fetched %s %s in %s namespaces.", count, kind, len(kind_index)
+        )
+        return kind_index
+
+    def index_event(self, event):
+        """[Add a listed event to the bounded index, used as keep of list_all]
+
+        Args:
+            event ([dict]): [Event object]
+
+        Returns:
+            [bool]: [False, events are not kept in the kind index]
+        """
+        self.event_index.add(event)
+        return False
+
+    def relist(self, kind, list_func, *args):
+        """[List a kind again, e.g. after its watch expired]
+
+        Args:
+            kind ([str]): [Resource kind]
+            list_func ([function]): [List function of the API]
+
+        Returns:
+            [dict]: [Resources indexed by namespace and name. Events the index
+                already has are None, only their names are kept]
+        """
+        return self.list_all(
+            kind,
+            list_func,
+            *args,
+            keep=self.unknown_event if kind == "events" else None,
+        )
+
+    def unknown_event(self, event):
+        """[Event to index if it is not in the index, used as keep of list_all]
+
+        Args:
+            event ([dict]): [Event object]
+
+        Returns:
+            [dict]: [Event, None if this version of it is already indexed]
+        """
+        return None if self.event_index.known(event) else event
+
+    def set_kind_index(self, kind, kind_index, namespace=None):
+        """[Replace the snapshot of a resource kind]
+
+        Args:
+            kind ([str]): [Resource kind]
+            kind_index ([dict]): [Resources indexed by namespace and name]
+            namespace ([str]): [Namespace the index covers, None for all namespaces]
+        """
+        if kind == "events":
+            # events are only kept in the bounded per-object index
+            for ns_events in kind_index.values():
+                for event in ns_events.values():
+                    self.event_index.add(event)
+            if namespace:
+                self.event_namespaces.add(namespace)
+            else:
+                self.all_events_indexed = True
+        else:
+            self.index[kind] = kind_index
+            self.index_scope[kind] = namespace
+
+    def load(self, namespace=None):
+        """[Fetch pods, services, ingresses, quotas, events and PVCs of the cluster]
+
+        Args:
+            namespace ([str]): [Namespace to load, None for all namespaces]
+
+        Returns:
+            [ClusterSnapshot]: [Loaded snapshot]
+        """
+        self.logger.info("Taking snapshot of cluster resources.")
+        for kind, (list_func, *args) in self.list_funcs(namespace).items():
+            # events go straight into the bounded index, they are never all held
+            keep = self.index_event if kind == "events" else None
+            kind_index = self.list_all(kind, list_func, *args, keep=keep)
+            if kind_index is not None:
+                self.set_kind_index(kind, kind_index, namespace)
+        return self
+
+    def namespace_names(self):
+        """[Namespaces which have resources in the snapshot]
+
+        Returns:
+            [list]: [Sorted namespace names]
+        """
+        namespaces = set()
+        for kind_index in self.index.values():
+            namespaces.update(kind_index)
+        for kind_cache in self.namespaced_index.values():
+            namespaces.update(kind_cache)
+        return sorted(ns for ns in namespaces if ns)
+
+    def save(self, path, extra=None):
+        """[Write the resources of the snapshot to a file]
+
+        Args:
+            path ([str]): [Snapshot file path]
+            extra ([dict]): [Additional data saved with the resources, e.g. findings]
+        """
+        sanitize = self.kube_client.api_client.sanitize_for_serialization
+        with self.lock:
+            data = {
+                "version": 1,
+                "index_scope": self.index_scope,
+                "resource_versions": self.resource_versions,
+                "event_namespaces": sorted(self.event_namespaces),
+                "all_events_indexed": self.all_events_indexed,
+                "resources": {
+                    kind: [
+                        sanitize(resource)
+                        for ns_index in kind_index.values()
+                        for resource in ns_index.values()
+                    ]
+                    for kind, kind_index in self.index.items()
+                },
+                "namespaced": {
+                    kind: {
+                        ns: sanitize(list(ns_index.values()))
+                        for ns, ns_index in kind_cache.items()
+                        if ns_index is not None
+                    }
+                    for kind, kind_cache in self.namespaced_index.items()
+                },
+                "cluster": {
+                    kind: sanitize(list(kind_index.values()))
+                    for kind, kind_index in self.cluster_index.items()
+                    if kind_index is not None
+                },
+                "names": {
+                    kind: {
+                        ns: sorted(names)
+                        for ns, names in kind_names.items()
+                        if names is not None
+                    }
+                    for kind, kind_names in self.name_index.items()
+                },
+                "extra": extra or {},
+            }
+            data["resources"]["events"] = [
+                sanitize(event)
+                for obj_events in self.event_index.events.values()
+                for _, _, event in obj_events
+            ]
+        with open(path, "w") as snapshot_file:
+            json.dump(data, snapshot_file)
+        self.logger.info(
+            "Saved snapshot of %s resources to %s.",
+            sum(len(resources) for resources in data["resources"].values()),
+            path,
+        )
+
+    def deserialize(self, kind, items):
+        """[Build model objects of a kind from saved resources]
+
+        Args:
+            kind ([str]): [Resource kind]
+            items ([list]): [Saved resources]
+
+        Returns:
+            [list]: [Resource objects]
+        """
+        return self.kube_client.api_client.deserialize(
+            SnapshotData(json.dumps(items)), "list[%s]" % self.KIND_TYPES[kind]
+        )
+
+    def restore(self, path, offline=True):
+        """[Load resources from a saved snapshot file instead of the cluster]
+
+        Args:
+            path ([str]): [Snapshot file path]
+            offline ([bool]): [False to keep using the cluster, e.g. to resume
+                watches. Lazily listed resources are then not restored.]
+
+        Returns:
+            [ClusterSnapshot]: [Loaded snapshot]
+        """
+        self.logger.info("Loading snapshot of cluster resources from %s.", path)
+        with open(path) as snapshot_file:
+            data = json.load(snapshot_file)
+        self.offline = offline
+        self.extra = data.get("extra", {})
+        self.resource_versions = data.get("resource_versions", {})
+        for kind, items in data.get("resources", {}).items():
+            if kind not in self.KIND_TYPES:
+                self.logger.debug("Skipping unknown kind %s in snapshot.", kind)
+                continue
+            kind_index = {}
+            for resource in self.deserialize(kind, items):
+                ns_index = kind_index.setdefault(resource.metadata.namespace, {})
+                ns_index[resource.metadata.name] = resource
+            self.set_kind_index(kind, kind_index, data["index_scope"].get(kind))
+        self.event_namespaces.update(data.get("event_namespaces", []))
+        self.all_events_indexed = data.get("all_events_indexed", False)
+        if not offline:
+            # secrets, configmaps, PVs and storage classes have no resource version
+            # to resume from, they are listed again when a check needs them
+            return self
+        for kind, kind_cache in data.get("namespaced", {}).items():
+            self.namespaced_index[kind] = {
+                ns: {
+                    resource.metadata.name: resource
+                    for resource in self.deserialize(kind, items)
+                }
+                for ns, items in kind_cache.items()
+            }
+        for kind, items in data.get("cluster", {}).items():
+            self.cluster_index[kind] = {
+                resource.metadata.name: resource
+                for resource in self.deserialize(kind, items)
+            }
+        for kind, kind_names in data.get("names", {}).items():
+            self.name_index[kind] = {
+                ns: set(names) for ns, names in kind_names.items()
+            }
+        return self
+
+    def upsert(self, kind, resource):
+        """[Add or replace a resource in the snapshot]
+
+        Args:
+            kind ([str]): [Resource kind]
+            resource ([dict]): [Resource object]
+
+        Returns:
+            [dict]: [Previous version of the resource, None if it is new]
+        """
+        if kind == "events":
+            self.event_index.add(resource)
+            return None
+        ns_index = self.index.setdefault(kind, {}).setdefault(
+            resource.metadata.namespace, {}
+        )
+        previous = ns_index.get(resource.metadata.name)
+        ns_index[resource.metadata.name] = resource
+        return previous
+
+    def delete(self, kind, resource):
+        """[Remove a resource from the snapshot]
+
+        Args:
+            kind ([str]): [Resource kind]
+            resource ([dict]): [Resource object]
+
+        Returns:
+            [dict]: [Removed resource, None if it was not in the snapshot]
+        """
+        if kind == "events":
+            self.event_index.remove(resource)
+            return None
+        if kind in self.OBJECT_KINDS:
+            self.event_index.discard(
+                self.OBJECT_KINDS[kind],
+                resource.metadata.namespace,
+                resource.metadata.name,
+            )
+        ns_index = self.index.get(kind, {}).get(resource.metadata.namespace, {})
+        return ns_index.pop(resource.metadata.name, None)
+
+    def get(self, kind, namespace):
+        """[Get resources of a kind in a namespace from the snapshot]
+
+        Args:
+            kind ([str]): [Resource kind]
+            namespace ([str]): [Namespace name]
+
+        Returns:
+            [ResourceList]: [Resources in the namespace, None if kind is not in snapshot]
+        """
+        if kind not in self.index or self.index_scope.get(kind) not in (None, namespace):
+            return None
+        return ResourceList(list(self.index[kind].get(namespace, {}).values()))
+
+    def cached(self, store, key, kind, namespace, fetch):
+        """[Lazily listed cache entry, listed on first use and again after cache_ttl]
+
+        Args:
+            store ([dict]): [Cache holding the entry]
+            key ([str]): [Key of the entry in the cache]
+            kind ([str]): [Resource kind]
+            namespace ([str]): [Namespace name, None for cluster scoped kinds]
+            fetch ([function]): [Lists the entry, returns None if listing failed]
+
+        Returns:
+            [object]: [Cached entry, None if it could not be listed]
+        """
+        with self.list_lock(kind, namespace):
+            if key not in store:
+                return self.fill(store, key, kind, namespace, fetch)
+            if not self.expired(kind, namespace):
+                return store[key]
+            if self.refresher is None:
+                return self.fill(store, key, kind, namespace, fetch)
+        # the expired entry is answered while it is listed again in background
+        with self.lock:
+            if (kind, namespace) not in self.refreshing:
+                self.refreshing.add((kind, namespace))
+                self.refresher.submit(self.refresh, store, key, kind, namespace, fetch)
+        return store[key]
+
+    def fill(self, store, key, kind, namespace, fetch):
+        """[List a cache entry and publish it]
+
+        Args:
+            store ([dict]): [Cache holding the entry]
+            key ([str]): [Key of the entry in the cache]
+            kind ([str]): [Resource kind]
+            namespace ([str]): [Namespace name, None for cluster scoped kinds]
+            fetch ([function]): [Lists the entry, returns None if listing failed]
+
+        Returns:
+            [object]: [Listed entry, None if it could not be listed]
+        """
+        listed_at = time.monotonic()
+        value = fetch()
+        with self.lock:
+            store[key] = value
+            # with a cache_ttl, failed lists are tried again on next use
+            self.cached_at[(kind, namespace)] = listed_at if value is not None else 0
+        return value
+
+    def refresh(self, store, key, kind, namespace, fetch):
+        """[List an expired cache entry again, runs in the refresher]"""
+        try:
+            with self.list_lock(kind, namespace):
+                self.fill(store, key, kind, namespace, fetch)
+        except Exception:
+            self.logger.exception("Refreshing %s of %s failed.", kind, namespace)
+        finally:
+            with self.lock:
+                self.refreshing.discard((kind, namespace))
+
+    def list_by_name(self, kind, list_func, namespace=None):
+        """[List a kind by name for a cache entry]
+
+        Args:
+            kind ([str]): [Resource kind]
+            list_func ([function]): [List function of the API]
+            namespace ([str]): [Namespace name, None for cluster scoped kinds]
+
+        Returns:
+            [dict]: [Resources by name, None if they could not be listed]
+        """
+        args = (namespace,) if namespace else ()
+        self.logger.debug("Fetching %s data of %s.", kind, namespace or "the cluster")
+        try:
+            return {
+                resource.metadata.name: resource
+                for resource in self.kube_client.list_paged(
+                    list_func, *args, timeout_seconds=10
+                )
+            }
+        except ApiException as exp:
+            # e.g. no cluster scoped RBAC, the checks are skipped
+            self.logger.warning(
+                "Exception when listing %s of %s: %s",
+                kind,
+                namespace or "the cluster",
+                exp,
+            )
+            return None
+
+    def namespaced_names(self, kind, namespace, list_func):
+        """[Get resources of a namespace by name, listed on first use and after
+        cache_ttl]
+
+        Args:
+            kind ([str]): [Resource kind]
+            namespace ([str]): [Namespace name]
+            list_func ([function]): [Namespaced list function of the API]
+
+        Returns:
+            [dict]: [Resources in the namespace by name, None if they could not be
+                listed]
+        """
+        if kind in self.index and self.index_scope.get(kind) in (None, namespace):
+            return self.index[kind].get(namespace, {})
+        with self.lock:
+            kind_cache = self.namespaced_index.setdefault(kind, {})
+        return self.cached(
+            kind_cache,
+            namespace,
+            kind,
+            namespace,
+            lambda: self.list_by_name(kind, list_func, namespace),
+        )
+
+    def namespaced(self, kind, namespace, list_func):
+        """[Get resources of a namespace, listed on first use and after cache_ttl]
+
+        Args:
+            kind ([str]): [Resource kind]
+            namespace ([str]): [Namespace name]
+            list_func ([function]): [Namespaced list function of the API]
+
+        Returns:
+            [ResourceList]: [Resources in the namespace]
+        """
+        return ResourceList(
+            list((self.namespaced_names(kind, namespace, list_func) or {}).values())
+        )
+
+    def cluster_scoped(self, kind, list_func):
+        """[Get cluster scoped resources by name, listed on first use and after
+        cache_ttl]
+
+        Args:
+            kind ([str]): [Resource kind]
+            list_func ([function]): [List function of the API]
+
+        Returns:
+            [dict]: [Resources by name, None if they could not be listed]
+        """
+        return self.cached(
+            self.cluster_index,
+            kind,
+            kind,
+            None,
+            lambda: self.list_by_name(kind, list_func),
+        )
+
+    def list_object_names(self, kind, namespace):
+        """[List names of a kind in a namespace for a cache entry]
+
+        Args:
+            kind ([str]): [Resource kind in NAME_PATHS]
+            namespace ([str]): [Namespace name]
+
+        Returns:
+            [set]: [Object names, None if they could not be listed]
+        """
+        self.logger.debug("Fetching %s namespace %s names.", namespace, kind)
+        try:
+            return self.kube_client.list_names(self.NAME_PATHS[kind], namespace)
+        except ApiException as exp:
+            self.logger.warning(
+                "Exception when listing %s names in namespace %s: %s",
+                kind,
+                namespace,
+                exp,
+            )
+            return None
+
+    def object_names(self, kind, namespace):
+        """[Names of a kind in a namespace, listed without the object data on first use
+        and after cache_ttl]
+
+        Args:
+            kind ([str]): [Resource kind in NAME_PATHS]
+            namespace ([str]): [Namespace name]
+
+        Returns:
+            [set]: [Object names, None if they could not be listed]
+        """
+        with self.lock:
+            kind_names = self.name_index.setdefault(kind, {})
+        return self.cached(
+            kind_names,
+            namespace,
+            kind,
+            namespace,
+            lambda: self.list_object_names(kind, namespace),
+        )
+
+    def pods(self, namespace):
+        """[Pods of the namespace]"""
+        return self.get("pods", namespace)
+
+    def services(self, namespace):
+        """[Services of the namespace]"""
+        return self.get("services", namespace)
+
+    def ingresses(self, namespace):
+        """[Ingresses of the namespace, cached per namespace for the run]"""
+        return self.namespaced(
+            "ingresses", namespace, self.network.list_namespaced_ingress
+        )
+
+    def resource_quotas(self, namespace):
+        """[Resource quotas of the namespace, cached per namespace for the run]"""
+        return self.namespaced(
+            "resourcequotas", namespace, self.core.list_namespaced_resource_quota
+        )
+
+    def pvc_index(self, namespace):
+        """[PVCs of the namespace by claim name, cached per namespace for the run]"""
+        return self.namespaced_names(
+            "persistentvolumeclaims",
+            namespace,
+            self.core.list_namespaced_persistent_volume_claim,
+        )
+
+    def secret_names(self, namespace):
+        """[Secret names of the namespace]"""
+        return self.object_names("secrets", namespace)
+
+    def configmap_names(self, namespace):
+        """[Configmap names of the namespace]"""
+        return self.object_names("configmaps", namespace)
+
+    def persistent_volumes(self):
+        """[PersistentVolumes of the cluster by name, cached up to cache_ttl]"""
+        return self.cluster_scoped(
+            "persistentvolumes", self.core.list_persistent_volume
+        )
+
+    def storage_classes(self):
+        """[StorageClasses of the cluster by name, cached up to cache_ttl]"""
+        return self.cluster_scoped("storageclasses", self.storage.list_storage_class)
+
+    def object_events(self, kind, namespace, name, uid=None):
+        """[Events of an object, namespace events are listed and indexed on first use]
+
+        Args:
+            kind ([str]): [Involved object kind]
+            namespace ([str]): [Namespace name]
+            name ([str]): [Involved object name]
+            uid ([str]): [Involved object uid]
+
+        Returns:
+            [list]: [Events of the object, newest first]
+        """
+        with self.list_lock("events", namespace):
+            if not self.all_events_indexed and namespace not in self.event_namespaces:
+                self.logger.debug("Fetching %s namespace events data.", namespace)
+                try:
+                    # events go to the bounded index page by page, as in load
+                    for event in self.kube_client.list_paged(
+                        self.core.list_namespaced_event, namespace, timeout_seconds=10
+                    ):
+                        with self.lock:
+                            self.index_event(event)
+                except ApiException as exp:
+                    # not marked as listed, the next lookup lists them again
+                    self.logger.warning(
+                        "Exception when calling CoreV1Api->list_namespaced_event: %s",
+                        exp,
+                    )
+                else:
+                    with self.lock:
+                        self.event_namespaces.add(namespace)
+        with self.lock:
+            return self.event_index.lookup(kind, namespace, name, uid)
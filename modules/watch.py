@@ -0,0 +1,551 @@
+"""[Module to diagnose continuously by following watch streams]"""
+import queue
+import threading
+import time
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+from .logging import Logger
+from .containers import ContainerWrench
+from .findings import FindingSink
+from .ingress import IngressWrench
+from .pods import PodWrench
+from .resource_quota import ResourceQuotaWrench
+from .service import ServiceWrench
+
+
+class WatchWrench:
+    """
+    Diagnose once from a snapshot, then re-run only the checks affected by changes
+    """
+
+    WATCH_KINDS = [
+        "pods",
+        "services",
+        "ingresses",
+        "events",
+        "resourcequotas",
+        "persistentvolumeclaims",
+    ]
+
+    def __init__(
+        self,
+        kube_client,
+        namespace,
+        logger,
+        snapshot,
+        prober=None,
+        sink=None,
+        quota_threshold=90,
+        collector=None,
+    ):
+        self.kube_client = kube_client
+        self.namespace = namespace
+        self.logger = logger
+        self.snapshot = snapshot
+        self.prober = prober
+        self.sink = sink or FindingSink()
+        self.quota_threshold = quota_threshold
+        self.collector = collector
+        self.events = queue.Queue()
+        # checks report into their own sink, only changes reach self.sink
+        self.check_sink = FindingSink()
+        self.check_logger = Logger.buffered_logger("watch")
+        self.findings = {}
+        # findings which appeared or cleared since start
+        self.finding_changes = {"new": 0, "cleared": 0}
+        self.wrenches = {}
+
+    def pod_state(self, pod):
+        """[Status fields of a pod which require its checks to be run again]
+
+        Args:
+            pod ([dict]): [Pod object]
+
+        Returns:
+            [tuple]: [Pod phase, node and container states]
+        """
+        if not pod:
+            return None
+        containers = tuple(
+            (
+                cont.name,
+                cont.ready,
+                cont.restart_count,
+                cont.state.waiting.reason if cont.state.waiting else None,
+                cont.state.terminated.reason if cont.state.terminated else None,
+            )
+            for cont in pod.status.container_statuses or []
+        )
+        return (pod.status.phase, pod.spec.node_name, containers)
+
+    def ns_wrenches(self, namespace):
+        """[Pod and service wrenches of a namespace, built once from the snapshot]
+
+        Args:
+            namespace ([str]): [Namespace name]
+
+        Returns:
+            [tuple]: [PodWrench and ServiceWrench of the namespace]
+        """
+        if namespace not in self.wrenches:
+            self.wrenches[namespace] = (
+                PodWrench(
+                    self.kube_client,
+                    namespace,
+                    self.check_logger,
+                    self.snapshot,
+                    self.prober,
+                    self.check_sink,
+                    self.collector,
+                ),
+                ServiceWrench(
+                    self.kube_client,
+                    namespace,
+                    self.check_logger,
+                    self.snapshot,
+                    self.prober,
+                    self.check_sink,
+                ),
+            )
+        return self.wrenches[namespace]
+
+    def track(self, key, check):
+        """[Run a check and report findings which appeared or cleared since last run]
+
+        Args:
+            key ([tuple]): [Kind, namespace and name of the checked object]
+            check ([function]): [Check to run, None when the object is deleted]
+        """
+        self.check_sink.collected = []
+        if check:
+            check()
+        # log lines of the checks are not needed, their findings are compared
+        self.check_logger.handlers[0].flush()
+        findings = {
+            finding.key: finding
+            for finding in self.check_sink.collected
+            if finding.severity != "info"
+        }
+        self.check_sink.collected = None
+        previous = self.findings.pop(key, {})
+        if findings:
+            self.findings[key] = findings
+        for finding_key in sorted(set(findings) - set(previous), key=str):
+            finding = findings[finding_key]
+            self.logger.warning(
+                "New finding for %s %s/%s: %s. %s", *key, finding.status, finding.message
+            )
+            self.sink.emit(finding, state="new")
+            self.finding_changes["new"] += 1
+        for finding_key in sorted(set(previous) - set(findings), key=str):
+            finding = previous[finding_key]
+            self.logger.info(
+                "Cleared finding for %s %s/%s: %s. %s",
+                *key,
+                finding.status,
+                finding.message,
+            )
+            self.sink.emit(finding, state="cleared")
+            self.finding_changes["cleared"] += 1
+
+    def track_found(self, key, findings):
+        """[Report findings which appeared or cleared for already collected findings]
+
+        Args:
+            key ([tuple]): [Kind, namespace and name of the checked object]
+            findings ([list]): [Findings of the object]
+        """
+        self.track(key, lambda: self.check_sink.collected.extend(findings))
+
+    def pod_checks(self, namespace, pods):
+        """[Run the snapshot checks of pods, their probes and log fetches are queued]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            pods ([list]): [Pod objects of the namespace]
+
+        Returns:
+            [dict]: [Pod, findings, probe targets and log targets by pod key]
+        """
+        pod_wrench, svc = self.ns_wrenches(namespace)
+        checked = {}
+        for pod in pods:
+            self.check_sink.collected = []
+            pod_wrench.check_pod_status(pod, svc)
+            checked[("Pod", namespace, pod.metadata.name)] = (
+                pod,
+                self.check_sink.collected,
+                svc.ingress.probe_targets,
+                pod_wrench.container.log_targets,
+            )
+            svc.ingress.probe_targets = {}
+            pod_wrench.container.log_targets = []
+        self.check_sink.collected = None
+        return checked
+
+    def batch_checks(self, namespace, checked):
+        """[Probe ingress urls and scan container logs of checked pods in one batch]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            checked ([dict]): [Pod checks by pod key, as returned by pod_checks]
+
+        Returns:
+            [dict]: [Probe and log findings by pod key]
+        """
+        sink = FindingSink()
+        sink.collected = []
+        ingress = IngressWrench(
+            self.kube_client,
+            namespace,
+            self.check_logger,
+            self.snapshot,
+            self.prober,
+            sink,
+        )
+        container = ContainerWrench(
+            self.kube_client,
+            namespace,
+            self.check_logger,
+            self.snapshot,
+            sink,
+            self.collector,
+        )
+        # urls shared by pods are probed once, their findings go to each pod
+        service_pods = {}
+        for key, (_, _, probe_targets, log_targets) in checked.items():
+            for target, mapped in probe_targets.items():
+                merged = ingress.probe_targets.setdefault(target, [])
+                for svc_name, ing_name in mapped:
+                    if (svc_name, ing_name) not in merged:
+                        merged.append((svc_name, ing_name))
+                    service_pods.setdefault(svc_name, set()).add(key)
+            container.log_targets += log_targets
+        ingress.ingress_probe()
+        container.container_logs()
+        found = {key: [] for key in checked}
+        for finding in sink.collected:
+            if finding.check == "container_log_root_cause":
+                # log findings are named pod/container
+                keys = [("Pod", namespace, finding.name.split("/")[0])]
+            else:
+                keys = service_pods.get(finding.name, ())
+            for key in keys:
+                if key in found:
+                    found[key].append(finding)
+        return found
+
+    def check_pods(self, namespace, pods):
+        """[Run pod, container and service checks of pods of a namespace]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            pods ([list]): [Pod objects of the namespace]
+        """
+        checked = self.pod_checks(namespace, pods)
+        found = self.batch_checks(namespace, checked)
+        for key, (_, findings, _, _) in checked.items():
+            self.track_found(key, findings + found[key])
+
+    def check_pod(self, pod):
+        """[Run pod, container and service checks of a pod]
+
+        Args:
+            pod ([dict]): [Pod object]
+        """
+        self.check_pods(pod.metadata.namespace, [pod])
+
+    def check_quota(self, namespace):
+        """[Run resource quota checks of a namespace]
+
+        Args:
+            namespace ([str]): [Namespace name]
+        """
+        quota = ResourceQuotaWrench(
+            self.kube_client,
+            namespace,
+            self.check_logger,
+            self.snapshot,
+            self.check_sink,
+            self.quota_threshold,
+        )
+        self.track(("ResourceQuota", namespace, "all"), quota.resource_quota_wrench)
+
+    def initial_diagnosis(self):
+        """[Run all checks on the snapshot to get the first set of findings]"""
+        namespaces = set(self.snapshot.index.get("pods", {}))
+        namespaces |= set(self.snapshot.index.get("resourcequotas", {}))
+        for namespace in sorted(namespaces):
+            self.check_pods(namespace, self.snapshot.pods(namespace).items)
+            self.check_quota(namespace)
+
+    def stream(self, kind, list_func, *args):
+        """[Follow the watch stream of a kind and queue its changes, runs in a thread]
+
+        Args:
+            kind ([str]): [Resource kind]
+            list_func ([function]): [List function of the API]
+        """
+        resource_version = self.snapshot.resource_versions.get(kind)
+        while True:
+            try:
+                for event in watch.Watch().stream(
+                    list_func,
+                    *args,
+                    resource_version=resource_version,
+                    timeout_seconds=300,
+                ):
+                    if event["type"] == "ERROR":
+                        raise ApiException(
+                            status=event["raw_object"].get("code"),
+                            reason=event["raw_object"].get("message"),
+                        )
+                    resource_version = event["object"].metadata.resource_version
+                    self.events.put((kind, event["type"], event["object"]))
+            except ApiException as exp:
+                if exp.status != 410:
+                    self.logger.warning("Watch of %s failed: %s", kind, exp)
+                    time.sleep(5)
+                    continue
+                # resource version is too old, start again from a fresh list. The
+                # list is applied by the main loop, the snapshot is only changed there
+                self.logger.info("Watch of %s expired. Listing %s again.", kind, kind)
+                list_meta = {}
+                kind_index = self.snapshot.list_all(
+                    kind, list_func, *args, list_meta=list_meta
+                )
+                if kind_index is None:
+                    time.sleep(5)
+                    continue
+                resource_version = list_meta.get("resource_version")
+                self.events.put((kind, "RELIST", (kind_index, resource_version)))
+            except Exception as exp:
+                self.logger.warning("Watch of %s interrupted: %s", kind, exp)
+                time.sleep(5)
+
+    def relist_changes(self, kind, kind_index):
+        """[Changes between the previous run and a fresh list of a kind]
+
+        Args:
+            kind ([str]): [Resource kind]
+            kind_index ([dict]): [Resources indexed by namespace and name]
+
+        Returns:
+            [list]: [Watch like events of added, modified and deleted resources]
+        """
+        if kind == "events":
+            changes = [
+                ("ADDED", event)
+                for ns_events in kind_index.values()
+                for event in ns_events.values()
+                if event is not None and not self.snapshot.event_index.known(event)
+            ]
+            # events the API server no longer has, e.g. expired after their ttl
+            for obj_events in self.snapshot.event_index.events.values():
+                for _, _, event in obj_events:
+                    namespace = event.metadata.namespace
+                    if self.namespace not in (None, namespace):
+                        continue
+                    if event.metadata.name not in kind_index.get(namespace, {}):
+                        changes.append(("DELETED", event))
+            return changes
+        previous = self.snapshot.index.get(kind, {})
+        changes = []
+        for namespace, ns_index in kind_index.items():
+            old_index = previous.get(namespace, {})
+            for name, resource in ns_index.items():
+                old = old_index.get(name)
+                if (
+                    old is None
+                    or old.metadata.resource_version != resource.metadata.resource_version
+                ):
+                    changes.append(("MODIFIED" if old else "ADDED", resource))
+        for namespace, old_index in previous.items():
+            for name, resource in old_index.items():
+                if name not in kind_index.get(namespace, {}):
+                    changes.append(("DELETED", resource))
+        return changes
+
+    def handle_service(self, event_type, svc):
+        """[Match pods of a namespace again when a service selector changed]
+
+        Args:
+            event_type ([str]): [Watch event type]
+            svc ([dict]): [Service object]
+        """
+        namespace = svc.metadata.namespace
+        if event_type == "DELETED":
+            previous = self.snapshot.delete("services", svc)
+        else:
+            previous = self.snapshot.upsert("services", svc)
+        if (
+            event_type != "DELETED"
+            and previous
+            and previous.spec.selector == svc.spec.selector
+        ):
+            return
+        self.logger.info(
+            "Selector of service %s/%s changed. Matching pods again.",
+            namespace,
+            svc.metadata.name,
+        )
+        self.wrenches.pop(namespace, None)
+        self.check_pods(
+            namespace,
+            [
+                pod
+                for pod in self.snapshot.pods(namespace).items
+                if pod.status.phase == "Running"
+            ],
+        )
+
+    def handle_ingress(self, event_type, ing):
+        """[Check running pods of a namespace again when an ingress changed]
+
+        Args:
+            event_type ([str]): [Watch event type]
+            ing ([dict]): [Ingress object]
+        """
+        namespace = ing.metadata.namespace
+        if event_type == "DELETED":
+            self.snapshot.delete("ingresses", ing)
+        else:
+            self.snapshot.upsert("ingresses", ing)
+        self.logger.info(
+            "Ingress %s/%s changed. Probing ingress urls again.",
+            namespace,
+            ing.metadata.name,
+        )
+        self.wrenches.pop(namespace, None)
+        self.check_pods(
+            namespace,
+            [
+                pod
+                for pod in self.snapshot.pods(namespace).items
+                if pod.status.phase == "Running"
+            ],
+        )
+
+    def handle_pod(self, event_type, pod):
+        """[Check a pod again when its status changed]
+
+        Args:
+            event_type ([str]): [Watch event type]
+            pod ([dict]): [Pod object]
+        """
+        if event_type == "DELETED":
+            self.snapshot.delete("pods", pod)
+            key = ("Pod", pod.metadata.namespace, pod.metadata.name)
+            self.track(key, None)
+            return
+        previous = self.snapshot.upsert("pods", pod)
+        if self.pod_state(previous) != self.pod_state(pod):
+            self.check_pod(pod)
+
+    def pod(self, namespace, name):
+        """[Pod of the snapshot by name]
+
+        Args:
+            namespace ([str]): [Namespace name]
+            name ([str]): [Pod name]
+
+        Returns:
+            [dict]: [Pod object, None if it is not in the snapshot]
+        """
+        return self.snapshot.index.get("pods", {}).get(namespace, {}).get(name)
+
+    def handle_event(self, event_type, event):
+        """[Check the pod of a warning event again]
+
+        Args:
+            event_type ([str]): [Watch event type]
+            event ([dict]): [Event object]
+        """
+        if event_type == "DELETED":
+            self.snapshot.delete("events", event)
+        else:
+            self.snapshot.upsert("events", event)
+        involved = event.involved_object
+        # normal events come with pod status changes, handle_pod checks those
+        if not involved or involved.kind != "Pod" or event.type == "Normal":
+            return
+        pod = self.pod(involved.namespace, involved.name)
+        if pod:
+            self.check_pod(pod)
+
+    def handle_pvc(self, event_type, pvc):
+        """[Check pods using a PVC again when the PVC changed]
+
+        Args:
+            event_type ([str]): [Watch event type]
+            pvc ([dict]): [PVC object]
+        """
+        if event_type == "DELETED":
+            self.snapshot.delete("persistentvolumeclaims", pvc)
+        else:
+            self.snapshot.upsert("persistentvolumeclaims", pvc)
+        namespace = pvc.metadata.namespace
+        self.check_pods(
+            namespace,
+            [
+                pod
+                for pod in self.snapshot.pods(namespace).items
+                if any(
+                    volume.persistent_volume_claim
+                    and volume.persistent_volume_claim.claim_name == pvc.metadata.name
+                    for volume in pod.spec.volumes or []
+                )
+            ],
+        )
+
+    def handle(self, kind, event_type, resource):
+        """[Apply a watch event to the snapshot and re-run affected checks]
+
+        Args:
+            kind ([str]): [Resource kind]
+            event_type ([str]): [Watch event type]
+            resource ([dict]): [Resource object, or kind index and resource version
+                for RELIST]
+        """
+        if event_type == "RELIST":
+            # changes missed while the watch was expired are applied like events
+            kind_index, self.snapshot.resource_versions[kind] = resource
+            changes = self.relist_changes(kind, kind_index)
+            self.logger.info("Relisted %s with %s changes.", kind, len(changes))
+            self.wrenches = {}
+            for change_type, changed in changes:
+                self.handle(kind, change_type, changed)
+        elif kind == "pods":
+            self.handle_pod(event_type, resource)
+        elif kind == "services":
+            self.handle_service(event_type, resource)
+        elif kind == "resourcequotas":
+            if event_type == "DELETED":
+                self.snapshot.delete(kind, resource)
+            else:
+                self.snapshot.upsert(kind, resource)
+            self.check_quota(resource.metadata.namespace)
+        elif kind == "events":
+            self.handle_event(event_type, resource)
+        elif kind == "persistentvolumeclaims":
+            self.handle_pvc(event_type, resource)
+        elif kind == "ingresses":
+            self.handle_ingress(event_type, resource)
+        elif event_type == "DELETED":
+            self.snapshot.delete(kind, resource)
+        else:
+            self.snapshot.upsert(kind, resource)
+
+    def watch_wrench(self):
+        """[Diagnose the snapshot and keep following changes until interrupted]"""
+        self.logger.info("Starting kube-wrench in watch mode.")
+        self.snapshot.load(self.namespace)
+        self.initial_diagnosis()
+        list_funcs = self.snapshot.list_funcs(self.namespace)
+        for kind in self.WATCH_KINDS:
+            threading.Thread(
+                target=self.stream, args=(kind, *list_funcs[kind]), daemon=True
+            ).start()
+        self.logger.info("Watching for changes of %s.", ", ".join(self.WATCH_KINDS))
+        while True:
+            self.handle(*self.events.get())